@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def no_thumbnail_workers(settings):
+    # a worker thread would still read the test database while it is
+    # flushed; see posts.thumbnails.submit
+    settings.THUMBNAIL_WORKERS = 0
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # the pages are invalidated on commit, and the test transactions are
+    # rolled back, so a page cached by one test would outlive its posts
+    cache.clear()
@@ -0,0 +1,237 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_SIZE=2)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(5)
+        ]
+        counters.recount_user(cls.author.pk)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data=None):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json'
+        )
+
+    def test_posts_are_paged_by_cursor(self):
+        """Посты отдаются страницами по курсору, новые первыми."""
+        url = reverse('api:post_list')
+        seen = []
+        params = {}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen += [post['id'] for post in data['results']]
+            if data['next'] is None:
+                break
+            params = {'after': data['next']}
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+        previous = self.client.get(url, {'before': data['previous']}).json()
+        self.assertEqual(
+            [post['id'] for post in previous['results']],
+            [self.posts[2].pk, self.posts[1].pk],
+        )
+        response = self.client.get(url, {'after': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_is_one_query_of_selected_fields(self):
+        """Список строится одним запросом только по выбранным полям."""
+        url = reverse('api:post_list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,author'})
+        self.assertEqual(response.json()['results'][0], {
+            'id': self.posts[-1].pk, 'author': 'author',
+        })
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['fields'][0])
+
+    def test_post_fields(self):
+        """Пост отдаётся со всеми полями."""
+        post = self.posts[0]
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.json(), {
+            'id': post.pk,
+            'text': 'Пост 0',
+            'pub_date': DjangoJSONEncoder().default(post.pub_date),
+            'author': 'author',
+            'group': 'group',
+            'image': None,
+            'comments_count': 0,
+        })
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает пустой ответ 304."""
+        url = reverse('api:post_list')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_filters(self):
+        """Посты фильтруются по группе и автору."""
+        Post.objects.create(author=self.reader, text='Без группы')
+        url = reverse('api:post_list')
+        data = self.client.get(url, {'author': 'reader'}).json()
+        self.assertEqual(
+            [post['text'] for post in data['results']], ['Без группы']
+        )
+        data = self.client.get(url, {'group': 'group', 'fields': 'group'})
+        self.assertEqual(
+            {post['group'] for post in data.json()['results']}, {'group'}
+        )
+        response = self.client.get(url, {'group': 'no'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_create_post(self):
+        """Пост создаёт только авторизованный пользователь."""
+        url = reverse('api:post_list')
+        data = {'text': 'Новый пост', 'group': 'group'}
+        response = self.send(self.client, 'post', url, data)
+        self.assertEqual(response.status_code, 401)
+        response = self.send(self.author_client, 'post', url, data)
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(
+            (post.text, post.author, post.group),
+            ('Новый пост', self.author, self.group),
+        )
+        self.assertEqual(counters.stats_for(self.author).posts_count, 6)
+
+        response = self.send(
+            self.author_client, 'post', url, {'text': '', 'group': 'none'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('group', response.json())
+        response = self.send(self.author_client, 'post', url, {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json())
+
+    @override_settings(POST_IMAGE_MAX_SIZE=2 ** 16)
+    def test_oversize_image_is_rejected(self):
+        """Картинку больше лимита API отклоняет, не дочитав тело."""
+        image = SimpleUploadedFile('image.png', os.urandom(2 ** 18))
+        response = self.author_client.post(
+            reverse('api:post_list'), {'text': 'Пост', 'image': image}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        self.assertEqual(counters.stats_for(self.author).posts_count, 5)
+
+    def test_edit_and_delete_post(self):
+        """Менять и удалять пост может только автор."""
+        post = self.posts[0]
+        url = reverse('api:post_detail', kwargs={'post_id': post.pk})
+        response = self.send(self.reader_client, 'patch', url, {'text': 'x'})
+        self.assertEqual(response.status_code, 403)
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Правка', 'group': ''}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['text'], 'Правка')
+        self.assertIsNone(response.json()['group'])
+
+        self.assertEqual(self.reader_client.delete(url).status_code, 403)
+        self.assertEqual(self.author_client.delete(url).status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertEqual(counters.stats_for(self.author).posts_count, 4)
+
+    def test_comments(self):
+        """Комментарии создаются и отдаются страницами."""
+        post = self.posts[0]
+        url = reverse('api:comment_list', kwargs={'post_id': post.pk})
+        for number in range(3):
+            data = {'text': f'Комментарий {number}'}
+            response = self.send(self.reader_client, 'post', url, data)
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(Comment.objects.filter(post=post).count(), 3)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 3)
+        data = self.client.get(url, {'fields': 'text'}).json()
+        self.assertEqual(
+            data['results'],
+            [{'text': 'Комментарий 2'}, {'text': 'Комментарий 1'}],
+        )
+        self.assertIsNotNone(data['next'])
+
+    def test_groups(self):
+        """Группы отдаются списком и по slug."""
+        data = self.client.get(reverse('api:group_list')).json()
+        self.assertEqual(data['results'], [{
+            'id': self.group.pk,
+            'title': 'Группа',
+            'slug': 'group',
+            'description': 'Описание',
+        }])
+        response = self.client.get(
+            reverse('api:group_detail', kwargs={'slug': 'group'}),
+            {'fields': 'title'},
+        )
+        self.assertEqual(response.json(), {'title': 'Группа'})
+
+    def test_follows(self):
+        """Подписки создаются, отдаются списком и удаляются."""
+        url = reverse('api:follow_list')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.reader_client.get(url).json()['results'],
+            [{'author': 'author'}],
+        )
+        self.assertEqual(counters.stats_for(self.author).followers_count, 1)
+
+        detail = reverse('api:follow_detail', kwargs={'username': 'author'})
+        self.assertEqual(self.reader_client.delete(detail).status_code, 204)
+        self.assertEqual(self.reader_client.delete(detail).status_code, 404)
+        self.assertFalse(Follow.objects.exists())
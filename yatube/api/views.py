@@ -0,0 +1,295 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import conditional_page
+
+from posts import actions
+from posts.forms import CommentForm, PostForm
+from posts.models import Follow, Group, Post
+from posts.paginators import InvalidCursor, KeysetPaginator
+from posts.uploads import ImageUploadHandler
+
+User = get_user_model()
+
+# field of the response -> lookup for values()
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+GROUP_FIELDS = {
+    'id': 'pk',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+FOLLOW_FIELDS = {
+    'author': 'author__username',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, errors, status=400):
+        super().__init__(errors)
+        self.errors = errors
+        self.status = status
+
+
+def api_view(*methods):
+    """JSON errors, login for writes and the request body as request.data.
+
+    GET responses carry an ETag of their content, and a client that sends
+    it back in If-None-Match gets an empty 304. Writes are parsed with
+    ImageUploadHandler in front, as in posts.views.ImageUploadMixin, so
+    the CSRF check runs after it is installed.
+    """
+    def decorator(view):
+        @csrf_protect
+        def handle(request, *args, **kwargs):
+            try:
+                request.data = parse_body(request)
+                return view(request, *args, **kwargs)
+            except Http404:
+                return JsonResponse({'detail': 'Не найдено'}, status=404)
+            except ApiError as error:
+                return JsonResponse(error.errors, status=error.status)
+
+        @csrf_exempt
+        @conditional_page
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse(
+                    {'detail': 'Метод не разрешён'}, status=405
+                )
+            if request.method != 'GET':
+                if not request.user.is_authenticated:
+                    return JsonResponse(
+                        {'detail': 'Нужно войти на сайт'}, status=401
+                    )
+                request.upload_handler = ImageUploadHandler(request)
+                request.upload_handlers.insert(0, request.upload_handler)
+            return handle(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def parse_body(request):
+    if request.method in ('GET', 'DELETE'):
+        return {}
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError({'detail': 'Тело запроса — не JSON'})
+        if not isinstance(data, dict):
+            raise ApiError({'detail': 'Ожидался объект JSON'})
+        return data
+    return request.POST.dict()
+
+
+def selected_fields(request, fields):
+    """Names from ?fields=a,b, all of the fields without it."""
+    names = [
+        name for name in request.GET.get('fields', '').split(',') if name
+    ]
+    unknown = set(names) - set(fields)
+    if unknown:
+        raise ApiError({
+            'fields': [f'Неизвестные поля: {", ".join(sorted(unknown))}'],
+        })
+    return names or list(fields)
+
+
+def serialize(row, fields, names):
+    item = {name: row[fields[name]] for name in names}
+    if 'image' in item:
+        item['image'] = (
+            default_storage.url(item['image']) if item['image'] else None
+        )
+    return item
+
+
+def rows(queryset, fields, names):
+    """values() of just the selected fields, keyed by their API names."""
+    return [
+        serialize(row, fields, names)
+        for row in queryset.values(*{fields[name] for name in names})
+    ]
+
+
+def page_response(request, queryset, fields, key_field):
+    """A page of rows after ?after= or before ?before= cursors."""
+    names = selected_fields(request, fields)
+    paginator = KeysetPaginator(
+        queryset.values(*{fields[name] for name in names}, 'pk', key_field),
+        settings.PAGE_SIZE,
+        key_field=key_field,
+    )
+    try:
+        page = paginator.page(
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
+    except InvalidCursor:
+        raise ApiError({'detail': 'Неверный курсор'})
+    return JsonResponse({
+        'results': [serialize(row, fields, names) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def one(request, queryset, fields, status=200):
+    found = rows(queryset, fields, selected_fields(request, fields))
+    if not found:
+        raise Http404
+    return JsonResponse(found[0], status=status)
+
+
+def form_errors(form):
+    return ApiError(form.errors.get_json_data())
+
+
+def post_form_data(data, post=None):
+    """Form data of a post from the API fields, the group as a slug."""
+    form_data = {}
+    if post is not None:
+        form_data = {'text': post.text, 'group': post.group_id}
+    if 'text' in data:
+        form_data['text'] = data['text']
+    if 'group' in data:
+        slug = data['group']
+        form_data['group'] = None
+        if slug:
+            group = Group.objects.filter(slug=slug).only('pk').first()
+            if group is None:
+                raise ApiError({'group': [f'Нет группы {slug}']})
+            form_data['group'] = group.pk
+    return form_data
+
+
+@api_view('GET', 'POST')
+def post_list(request):
+    if request.method == 'POST':
+        form = PostForm(
+            post_form_data(request.data), request.FILES or None,
+            upload_error=request.upload_handler.error,
+        )
+        if not form.is_valid():
+            raise form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        actions.publish_post(post)
+        return one(request, Post.objects.filter(pk=post.pk), POST_FIELDS, 201)
+
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(
+            group=get_object_or_404(Group, slug=request.GET['group'])
+        )
+    if request.GET.get('author'):
+        queryset = queryset.filter(
+            author=get_object_or_404(User, username=request.GET['author'])
+        )
+    return page_response(request, queryset, POST_FIELDS, 'pub_date')
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    if request.method == 'GET':
+        return one(request, Post.objects.filter(pk=post_id), POST_FIELDS)
+
+    post = get_object_or_404(Post, pk=post_id)
+    if post.author_id != request.user.pk:
+        raise ApiError({'detail': 'Пост может менять только автор'}, 403)
+    if request.method == 'DELETE':
+        actions.delete_post(post)
+        return HttpResponse(status=204)
+
+    form = PostForm(post_form_data(request.data, post), instance=post)
+    if not form.is_valid():
+        raise form_errors(form)
+    form.save()
+    return one(request, Post.objects.filter(pk=post.pk), POST_FIELDS)
+
+
+@api_view('GET', 'POST')
+def comment_list(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    if request.method == 'POST':
+        form = CommentForm(request.data)
+        if not form.is_valid():
+            raise form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        actions.add_comment(comment)
+        return one(
+            request, post.comments.filter(pk=comment.pk), COMMENT_FIELDS, 201
+        )
+
+    return page_response(
+        request, post.comments.all(), COMMENT_FIELDS, 'created'
+    )
+
+
+@api_view('GET')
+def group_list(request):
+    names = selected_fields(request, GROUP_FIELDS)
+    return JsonResponse({
+        'results': rows(Group.objects.order_by('title'), GROUP_FIELDS, names),
+    })
+
+
+@api_view('GET')
+def group_detail(request, slug):
+    return one(request, Group.objects.filter(slug=slug), GROUP_FIELDS)
+
+
+@api_view('GET', 'POST')
+def follow_list(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужно войти на сайт'}, status=401)
+    if request.method == 'POST':
+        author = User.objects.filter(
+            username=request.data.get('author', '')
+        ).first()
+        if author is None or author == request.user:
+            raise ApiError({'author': ['Нельзя подписаться на этого автора']})
+        created = actions.follow(request.user, author)
+        return JsonResponse(
+            {'author': author.username}, status=201 if created else 200
+        )
+
+    names = selected_fields(request, FOLLOW_FIELDS)
+    following = Follow.objects.filter(user=request.user).order_by(
+        'author__username'
+    )
+    return JsonResponse({
+        'results': rows(following, FOLLOW_FIELDS, names),
+    })
+
+
+@api_view('DELETE')
+def follow_detail(request, username):
+    author = get_object_or_404(User, username=username)
+    if not actions.unfollow(request.user, author):
+        raise Http404
+    return HttpResponse(status=204)
@@ -0,0 +1,84 @@
+"""Cache hit rate and latency seen by N worker processes.
+
+    python -m benchmarks.cache --workers 4
+
+Every worker plays the same skewed stream of page requests against the
+cache: a hit is served from the cache, a miss "renders" the page for
+--render-ms and stores it. locmem gives each worker its own copy, while
+the file cache stands in for a shared backend such as Redis, so the
+script runs offline. Keep --pages under the backends' MAX_ENTRIES (300
+by default), or culling will dominate the numbers.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from .common import print_table, setup_django
+
+
+def worker(backend, location, options, seed):
+    os.environ['CACHE_BACKEND'] = backend
+    os.environ['CACHE_LOCATION'] = location
+    setup_django(test_database=False)
+    from django.core.cache import cache
+
+    rng = random.Random(seed)
+    # Zipf-like popularity: page n is requested ~1/n**0.8 as often
+    weights = [1 / (n + 1) ** 0.8 for n in range(options.pages)]
+    pages = rng.choices(range(options.pages), weights, k=options.requests)
+    hits = 0
+    latency = 0.0
+    for page_number in pages:
+        key = f'page:{page_number}'
+        start = time.perf_counter()
+        page = cache.get(key)
+        latency += time.perf_counter() - start
+        if page is not None:
+            hits += 1
+            continue
+        time.sleep(options.render_ms / 1000)
+        cache.set(key, 'x' * options.page_size, None)
+    return hits, latency
+
+
+def run_backend(backend, options):
+    with tempfile.TemporaryDirectory() as location:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(options.workers) as pool:
+            start = time.perf_counter()
+            results = pool.starmap(worker, [
+                (backend, location, options, seed)
+                for seed in range(options.workers)
+            ])
+            elapsed = time.perf_counter() - start
+    requests = options.requests * options.workers
+    hits = sum(hits for hits, _ in results)
+    latency = sum(latency for _, latency in results)
+    return (
+        backend,
+        f'{hits / requests:.1%}',
+        f'{latency / requests * 1e6:.1f}',
+        f'{elapsed:.2f}',
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=250)
+    parser.add_argument('--page-size', type=int, default=20000)
+    parser.add_argument('--render-ms', type=float, default=2)
+    options = parser.parse_args()
+
+    print_table(
+        ('backend', 'hit rate', 'get, us', 'total, s'),
+        [run_backend(backend, options) for backend in ('locmem', 'file')],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Shared set-up for the scripts in this package.
+
+Run them from the directory with manage.py, e.g.
+``python -m benchmarks.feed``. Every script works on a throwaway test
+database, so the development db.sqlite3 is never touched.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django(test_database=True, test_database_name=None):
+    """Set up Django, by default on a fresh in-memory test database.
+
+    Pass test_database_name for a file database, which unlike the
+    in-memory one lets threads read and write concurrently.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    import django
+    django.setup()
+    if not test_database:
+        return
+
+    from django.conf import settings
+    from django.db import connection
+    if test_database_name is not None:
+        settings.DATABASES['default']['TEST'] = {'NAME': test_database_name}
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def print_table(header, rows):
+    widths = [
+        max(len(str(cell)) for cell in column)
+        for column in zip(header, *rows)
+    ]
+    for row in [header, *rows]:
+        print('  '.join(
+            str(cell).rjust(width) for cell, width in zip(row, widths)
+        ))
@@ -0,0 +1,151 @@
+"""Requests per second of the follow feed under concurrent readers.
+
+    python -m benchmarks.concurrency --threads 1 8 32
+
+Every thread is a logged-in reader requesting the follow feed, whose
+posts all have images, through the WSGI handler. The feed is not kept in
+the page cache, so each request runs its queries and looks up one
+thumbnail per post card: either one cache call per card, or the whole
+page with one get_many. The rendered post cards are cached in the
+last mode only, the others render every card of every request. Every
+call to the cache sleeps for --cache-latency-ms, the round trip to a
+shared backend such as Redis.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from .common import print_table, setup_django
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def build(options):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from posts import thumbnails
+    from posts.models import Follow, Post
+
+    User = get_user_model()
+    author = User.objects.create_user(username='author')
+    readers = [
+        User.objects.create_user(username=f'reader{n}')
+        for n in range(max(options.threads))
+    ]
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author) for reader in readers
+    )
+    for n in range(settings.PAGE_SIZE):
+        post = Post.objects.create(
+            author=author, text=f'Пост {n}',
+            image=SimpleUploadedFile(f'small{n}.gif', SMALL_GIF),
+        )
+        thumbnails.generate(post.pk)
+    return readers
+
+
+def run(readers, threads, seconds):
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    url = reverse('posts:follow_index')
+    stop = threading.Event()
+    latencies = []
+
+    def reader(user):
+        client = Client()
+        client.force_login(user)
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                client.get(url)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    workers = [
+        threading.Thread(target=reader, args=(readers[n],))
+        for n in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    return len(latencies) / seconds, p95
+
+
+def with_latency(method, seconds):
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return method(*args, **kwargs)
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--cache-latency-ms', type=float, default=0.5)
+    options = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        setup_django(
+            test_database_name=os.path.join(directory, 'concurrency.sqlite3')
+        )
+        from django.conf import settings
+        from django.core.cache.backends.locmem import LocMemCache
+        from django.test.utils import override_settings
+        from posts import thumbnails
+
+        latency = options.cache_latency_ms / 1000
+        cards_timeout = settings.POST_CARD_CACHE_TIMEOUT
+        rows = []
+        with override_settings(MEDIA_ROOT=directory), \
+                mock.patch.multiple(LocMemCache, **{
+                    name: with_latency(getattr(LocMemCache, name), latency)
+                    for name in ('get', 'get_many', 'set', 'set_many', 'add')
+                }):
+            readers = build(options)
+            for threads in options.threads:
+                for mode in ('per card', 'get_many', 'cached cards'):
+                    if mode == 'per card':
+                        patch = mock.patch.object(thumbnails, 'prefetch')
+                    else:
+                        patch = nullcontext()
+                    # a timeout of 0 expires the rendered cards at once
+                    timeout = (
+                        cards_timeout if mode == 'cached cards' else 0
+                    )
+                    with patch, override_settings(
+                        POST_CARD_CACHE_TIMEOUT=timeout
+                    ):
+                        rate, p95 = run(readers, threads, options.seconds)
+                    rows.append(
+                        (threads, mode, f'{rate:.0f}', f'{p95 * 1000:.1f}')
+                    )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print_table(('threads', 'mode', 'requests/s', 'p95, ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
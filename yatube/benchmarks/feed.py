@@ -0,0 +1,111 @@
+"""Pull, push and hybrid follow feeds on a synthetic follow graph.
+
+    python -m benchmarks.feed --users 1000 --celebrities 5
+
+A handful of "celebrity" authors are followed by most users, everybody
+else by a few random readers. For every strategy the script reports
+the time and rows spent fanning out all posts and the time to render
+the first feed page for a sample of readers.
+"""
+import argparse
+import random
+
+from .common import print_table, setup_django, timer
+
+
+def build_graph(options):
+    from django.contrib.auth import get_user_model
+    from posts import counters
+    from posts.models import Follow, Post
+
+    User = get_user_model()
+    rng = random.Random(options.seed)
+    User.objects.bulk_create(
+        User(username=f'user{i}') for i in range(options.users)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    celebrities = user_ids[:options.celebrities]
+    regular = user_ids[options.celebrities:]
+
+    follows = set()
+    for user_id in user_ids:
+        for author_id in celebrities:
+            if rng.random() < 0.8:
+                follows.add((user_id, author_id))
+        for author_id in rng.sample(regular, options.follows):
+            follows.add((user_id, author_id))
+    follows = {pair for pair in follows if pair[0] != pair[1]}
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author) for user, author in follows),
+        batch_size=500,
+    )
+    Post.objects.bulk_create(
+        (
+            Post(author_id=author_id, text=f'Пост {n}')
+            for author_id in user_ids
+            for n in range(options.posts)
+        ),
+        batch_size=500,
+    )
+    # bulk_create skips the counters the feed reads celebrities from
+    counters.repair()
+    return rng.sample(user_ids, options.readers)
+
+
+def run_strategy(name, settings, readers):
+    from django.contrib.auth import get_user_model
+    from django.core.paginator import Paginator
+    from django.test.utils import override_settings
+    from posts import feed
+    from posts.models import Post, TimelineEntry
+
+    User = get_user_model()
+    results = {}
+    TimelineEntry.objects.all().delete()
+    with override_settings(**settings):
+        feed.update_celebrities()
+        with timer(results, 'write'):
+            for post in Post.objects.all().iterator():
+                feed.push_post(post)
+        users = list(User.objects.filter(pk__in=readers))
+        with timer(results, 'read'):
+            for user in users:
+                page = Paginator(feed.feed_for(user), 10).get_page(1)
+                list(page)
+    return (
+        name,
+        f'{results["write"]:.2f}',
+        TimelineEntry.objects.count(),
+        f'{results["read"] / len(readers) * 1000:.2f}',
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--celebrities', type=int, default=5)
+    parser.add_argument('--follows', type=int, default=30)
+    parser.add_argument('--posts', type=int, default=5)
+    parser.add_argument('--readers', type=int, default=200)
+    parser.add_argument('--threshold', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    setup_django()
+    readers = build_graph(options)
+    strategies = [
+        ('pull', {'FEED_TIMELINE': False}),
+        ('push', {'FEED_TIMELINE': True, 'FEED_CELEBRITY_THRESHOLD': None}),
+        ('hybrid', {
+            'FEED_TIMELINE': True,
+            'FEED_CELEBRITY_THRESHOLD': options.threshold,
+        }),
+    ]
+    print_table(
+        ('strategy', 'fan-out, s', 'timeline rows', 'read, ms/page'),
+        [run_strategy(name, s, readers) for name, s in strategies],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Concurrent reads and writes on a file SQLite database.
+
+    python -m benchmarks.load --readers 8 --writers 2 --seconds 5
+
+Reader threads run the query of the index page, writer threads add
+comments and posts the way add_comment and PostCreate do. The same load
+runs with SQLite's default rollback journal and with the WAL pragmas of
+settings.SQLITE_PRAGMAS; the script reports throughput, p95 latency
+and the "database is locked" errors of both.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from .common import print_table, setup_django
+
+ROLLBACK_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 5000,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed(options):
+    from django.contrib.auth import get_user_model
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'user{i}') for i in range(options.writers + 1)
+    )
+    author = User.objects.first()
+    group = Group.objects.create(title='Группа', slug='group')
+    Post.objects.bulk_create(
+        Post(author=author, group=group, text=f'Пост {n}')
+        for n in range(options.posts)
+    )
+    return list(User.objects.values_list('pk', flat=True)), group.pk
+
+
+def read(stop, latencies, errors):
+    from django.conf import settings
+    from django.db import OperationalError, connection
+    from posts.models import Post
+
+    try:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                list(Post.objects.select_related('author', 'group')[
+                    :settings.PAGE_SIZE
+                ])
+            except OperationalError:
+                errors.append('read')
+                continue
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+def write(stop, latencies, errors, user_id, group_id):
+    from django.db import OperationalError, connection, transaction
+    from posts.models import Comment, Post
+
+    post_id = Post.objects.values_list('pk', flat=True).first()
+    number = 0
+    try:
+        while not stop.is_set():
+            number += 1
+            start = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    if number % 5:
+                        Comment.objects.create(
+                            post_id=post_id, author_id=user_id,
+                            text=f'Комментарий {number}',
+                        )
+                    else:
+                        Post.objects.create(
+                            author_id=user_id, group_id=group_id,
+                            text=f'Новый пост {number}',
+                        )
+            except OperationalError:
+                errors.append('write')
+                continue
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+def run_mode(mode, options):
+    with tempfile.TemporaryDirectory() as directory:
+        # a file database, the in-memory one has no journal to compare
+        setup_django(
+            test_database_name=os.path.join(directory, 'load.sqlite3')
+        )
+        from django.conf import settings
+        from django.db import connection
+
+        if mode == 'rollback':
+            # the next connections switch the file back to the journal
+            settings.SQLITE_PRAGMAS = ROLLBACK_PRAGMAS
+            connection.close()
+        user_ids, group_id = seed(options)
+        connection.close()
+
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+        threads = [
+            threading.Thread(target=read, args=(stop, reads, errors))
+            for _ in range(options.readers)
+        ] + [
+            threading.Thread(
+                target=write,
+                args=(stop, writes, errors, user_ids[n + 1], group_id),
+            )
+            for n in range(options.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return (
+        mode,
+        f'{len(reads) / options.seconds:.0f}',
+        f'{len(writes) / options.seconds:.0f}',
+        f'{percentile(reads, 0.95) * 1000:.1f}',
+        f'{percentile(writes, 0.95) * 1000:.1f}',
+        errors.count('read'),
+        errors.count('write'),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--posts', type=int, default=1000)
+    options = parser.parse_args()
+
+    # every mode in a fresh process, Django is set up only once per process
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        rows = pool.starmap(run_mode, [
+            (mode, options) for mode in ('rollback', 'wal')
+        ])
+    print_table(
+        (
+            'journal', 'reads/s', 'writes/s', 'read p95, ms',
+            'write p95, ms', 'read errors', 'write errors',
+        ),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Inverted index search against an icontains scan as the table grows.
+
+    python -m benchmarks.search --sizes 10000 100000 1000000
+
+Posts are random sentences over a Zipf-distributed vocabulary. One word
+is planted in a fixed number of posts of the first batch, so its posting
+list stays the same size while the table grows: the index query time
+should stay flat, the scan grows with the table.
+"""
+import argparse
+import itertools
+import random
+
+from .common import print_table, setup_django, timer
+
+NEEDLE = 'выдра'
+
+
+def vocabulary(size):
+    return [f'слово{n}' for n in range(size)]
+
+
+def grow(author, start, stop, options, rng, words, weights):
+    from posts import search
+    from posts.models import Post, SearchEntry
+
+    batch = 5000
+    for offset in range(start, stop, batch):
+        texts = [
+            ' '.join(rng.choices(words, cum_weights=weights, k=options.words))
+            for _ in range(min(batch, stop - offset))
+        ]
+        if offset == 0:
+            for index in rng.sample(range(len(texts)), options.matches):
+                texts[index] += f' {NEEDLE}'
+        posts = Post.objects.bulk_create(
+            Post(author=author, text=text) for text in texts
+        )
+        if posts[0].pk is None:
+            # sqlite does not return ids from bulk_create
+            posts = Post.objects.order_by('-pk')[:len(posts)]
+        SearchEntry.objects.bulk_create(
+            entry for post in posts
+            for entry in search.entries_for(post.pk, post.text)
+        )
+
+
+def measure(options):
+    from django.core.paginator import Paginator
+    from posts import search
+    from posts.models import Post
+
+    results = {}
+    with timer(results, 'index'):
+        for _ in range(options.repeat):
+            page = Paginator(search.search(NEEDLE).for_listing(), 10)
+            list(page.get_page(1))
+    with timer(results, 'scan'):
+        for _ in range(options.repeat):
+            posts = Post.objects.filter(
+                text__icontains=NEEDLE
+            ).for_listing()
+            page = Paginator(posts, 10)
+            list(page.get_page(1))
+    return {
+        name: f'{seconds / options.repeat * 1000:.2f}'
+        for name, seconds in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10000, 30000, 100000]
+    )
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--words', type=int, default=12)
+    parser.add_argument('--matches', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    author = get_user_model().objects.create_user(username='benchmark')
+    rng = random.Random(options.seed)
+    words = vocabulary(options.vocabulary)
+    weights = list(itertools.accumulate(
+        1 / rank for rank in range(1, len(words) + 1)
+    ))
+
+    rows = []
+    size = 0
+    for target in sorted(options.sizes):
+        grow(author, size, target, options, rng, words, weights)
+        size = target
+        timings = measure(options)
+        rows.append((size, timings['index'], timings['scan']))
+    print_table(('posts', 'index, ms/query', 'icontains, ms/query'), rows)
+
+
+if __name__ == '__main__':
+    main()
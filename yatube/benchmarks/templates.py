@@ -0,0 +1,116 @@
+"""Render time of the index and post pages with and without cached templates.
+
+    python -m benchmarks.templates --renders 500
+
+Both pages are rendered from the same context, built once from the test
+database, through two engines: the loaders of settings.TEMPLATES, which
+read and parse the page, its base and includes on every render, and the
+cached loader of the prod profile, which does it once per worker.
+The difference is the saving per request.
+"""
+import argparse
+import copy
+import time
+
+from .common import print_table, setup_django
+
+
+def build(options):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from django.urls import reverse
+    from posts import counters, views
+    from posts.forms import CommentForm
+    from posts.models import Comment, Group, Post
+
+    User = get_user_model()
+    author = User.objects.create_user(username='author')
+    group = Group.objects.create(title='Группа', slug='group')
+    Post.objects.bulk_create(
+        Post(author=author, group=group, text=f'Пост {n} ' * 20)
+        for n in range(settings.PAGE_SIZE)
+    )
+    post = Post.objects.select_related('author', 'group').first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=author, text=f'Комментарий {n}')
+        for n in range(options.comments)
+    )
+    counters.recount_user(author.pk)
+
+    request = RequestFactory().get(reverse('posts:index'))
+    request.user = AnonymousUser()
+    page_obj = views.set_pagination(request, Post.objects.for_listing())
+    comments = views.set_comments_page(request, post)
+    # the querysets are run here, the loop below only renders
+    list(page_obj)
+    list(comments)
+    return request, {
+        'posts/index.html': {'page_obj': page_obj},
+        'posts/post_detail.html': {
+            'post': post,
+            'author_stats': counters.stats_for(post.author),
+            'comments': comments,
+            'form': CommentForm(),
+        },
+    }
+
+
+def engine(name, loaders=None):
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    params = copy.deepcopy(settings.TEMPLATES[0])
+    params['NAME'] = name
+    if loaders is not None:
+        params['APP_DIRS'] = False
+        params['OPTIONS']['loaders'] = loaders
+    params.pop('BACKEND')
+    return DjangoTemplates(params)
+
+
+def render_ms(backend, request, template_name, context, renders):
+    # the first render fills the cache of post cards for both engines
+    backend.get_template(template_name).render(context, request)
+    start = time.perf_counter()
+    for _ in range(renders):
+        backend.get_template(template_name).render(context, request)
+    return (time.perf_counter() - start) / renders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=500)
+    parser.add_argument('--comments', type=int, default=20)
+    options = parser.parse_args()
+
+    setup_django()
+    from yatube.settings import prod
+
+    request, contexts = build(options)
+    uncached = engine('uncached')
+    cached = engine('cached', prod.TEMPLATES[0]['OPTIONS']['loaders'])
+    rows = []
+    for template_name, context in contexts.items():
+        before = render_ms(
+            uncached, request, template_name, context, options.renders
+        )
+        after = render_ms(
+            cached, request, template_name, context, options.renders
+        )
+        rows.append((
+            template_name,
+            f'{before:.3f}',
+            f'{after:.3f}',
+            f'{before - after:.3f}',
+            f'{1 - after / before:.0%}',
+        ))
+    print_table(
+        ('template', 'loaders, ms', 'cached, ms', 'saved, ms', 'saved'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
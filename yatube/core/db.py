@@ -0,0 +1,107 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+
+_state = threading.local()
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # the raw cursor keeps the pragmas out of connection.queries
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def has_replica():
+    return REPLICA in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f'core:primary:{user_id}'
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+def pin(user):
+    """Send the reads of a user to the primary while the replica catches up."""
+    cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+@contextmanager
+def _reading_from(replica):
+    previous = getattr(_state, 'replica', False)
+    _state.replica = replica
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def primary():
+    """Read from the primary inside a view decorated by read_from_replica."""
+    return _reading_from(False)
+
+
+def read_from_replica(view):
+    """Send the reads of a GET view to the replica.
+
+    Users who wrote something in the last REPLICA_PIN_SECONDS keep reading
+    from the primary, so they always see their own posts and comments.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replica = (
+            has_replica()
+            and request.method in ('GET', 'HEAD')
+            and not is_pinned(request.user)
+        )
+        with _reading_from(replica):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Writes go to the primary, reads to the replica only when asked."""
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'replica', False):
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # the database cache backend routes its entries as well
+        if model._meta.app_label != 'django_cache':
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class PrimaryPinMiddleware:
+    """Pin the users who wrote during a request to the primary."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        response = self.get_response(request)
+        if _state.wrote and has_replica() and request.user.is_authenticated:
+            pin(request.user)
+        return response
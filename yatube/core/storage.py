@@ -0,0 +1,37 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files with a gzipped copy of every text file.
+
+    The web server sends name.gz to the clients that accept gzip, so no
+    request compresses a file.
+    """
+    compressed_extensions = ('.css', '.js', '.svg', '.txt', '.json', '.map')
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(self.compressed_extensions):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        compressed = gzip.compress(content, 9)
+        if len(compressed) >= len(content):
+            return
+        if self.exists(name + '.gz'):
+            self.delete(name + '.gz')
+        self._save(name + '.gz', ContentFile(compressed))
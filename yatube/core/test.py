@@ -1,4 +1,31 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.template import engines
+from django.template.loader import get_template
+from django.template.loaders.filesystem import Loader
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from posts import caching
+from posts.models import Follow, Post
+from yatube.settings import prod
+
+from . import db
+from .warmup import template_names, warm_up_templates
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +35,269 @@ class ViewTestClass(TestCase):
         self.assertEqual(response.status_code, 404)
         # Проверьте, что используется шаблон core/404.html
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLitePragmaTest(TestCase):
+    def test_file_database_uses_wal(self):
+        """Файловая база SQLite открывается в режиме WAL."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite pragmas')
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = connections['default'].__class__({
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            })
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    # NORMAL
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(
+                        cursor.fetchone()[0],
+                        settings.SQLITE_PRAGMAS['busy_timeout'],
+                    )
+            finally:
+                wrapper.close()
+
+
+@override_settings(TEMPLATES=prod.TEMPLATES)
+class TemplateWarmUpTest(TestCase):
+    def test_templates_are_compiled_once(self):
+        """После прогрева шаблоны не читаются с диска."""
+        names = list(template_names())
+        self.assertIn('posts/index.html', names)
+        self.assertIn('posts/includes/post_card.html', names)
+        self.assertEqual(warm_up_templates(), len(names))
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertTrue(set(names) <= set(loader.get_template_cache))
+        with mock.patch.object(Loader, 'get_contents') as get_contents:
+            get_template('posts/index.html')
+            get_template('posts/post_detail.html')
+        get_contents.assert_not_called()
+
+
+# run by ProductionProfileTest in a fresh interpreter with DJANGO_ENV=prod
+PROD_SCRIPT = """
+import json, os, re, sys, tracemalloc
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from yatube.wsgi import application
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.urls import reverse
+
+from core.warmup import template_names
+from posts.models import Group, Post
+
+directory = sys.argv[1]
+# the repository keeps no static files, stand-ins of the used ones
+source = os.path.join(directory, 'source')
+for name in template_names():
+    with open(os.path.join(settings.TEMPLATES_DIR, name)) as template:
+        used = re.findall(r"static '([^']+)'", template.read())
+    for static_name in used:
+        path = os.path.join(source, static_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as static_file:
+            static_file.write('body { color: black; }\\n' * 100)
+settings.STATICFILES_DIRS = [source]
+call_command('collectstatic', interactive=False, verbosity=0)
+
+connection.creation.create_test_db(verbosity=0)
+author = get_user_model().objects.create_user(username='author')
+group = Group.objects.create(title='Группа', slug='group')
+posts = [
+    Post.objects.create(author=author, group=group, text=f'Пост {n}')
+    for n in range(15)
+]
+urls = [
+    reverse('posts:index'),
+    reverse('posts:index') + '?page=2',
+    reverse('posts:group_list', args=['group']),
+    reverse('posts:profile', args=['author']),
+    reverse('posts:search') + '?' + urlencode({'q': 'Пост'}),
+] + [reverse('posts:post_detail', args=[post.pk]) for post in posts]
+
+statuses = set()
+
+
+def get(url):
+    # straight through the worker's WSGI application
+    path, _, query = url.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query}
+    setup_testing_defaults(environ)
+    response = application(
+        environ, lambda status, headers: statuses.add(status)
+    )
+    b''.join(response)
+    response.close()
+
+
+for url in urls * 3:
+    get(url)
+tracemalloc.start()
+start = tracemalloc.get_traced_memory()[0]
+for url in urls * 10:
+    get(url)
+growth = tracemalloc.get_traced_memory()[0] - start
+loader = engines['django'].engine.template_loaders[0]
+print(json.dumps({
+    'debug': settings.DEBUG,
+    'statuses': sorted(statuses),
+    'queries': len(connection.queries_log),
+    'growth': growth,
+    'templates': len(loader.get_template_cache),
+    'cache': settings.CACHES['default']['BACKEND'],
+}))
+"""
+
+
+class ProductionProfileTest(SimpleTestCase):
+    def test_profile_loads_and_stays_bounded(self):
+        """Профиль prod загружается, и память воркера не растёт."""
+        with tempfile.TemporaryDirectory() as directory:
+            static_root = os.path.join(directory, 'static')
+            result = subprocess.run(
+                [sys.executable, '-c', PROD_SCRIPT, directory],
+                cwd=settings.BASE_DIR,
+                # CACHE_BACKEND is left to the profile's default
+                env={
+                    **{
+                        name: value for name, value in os.environ.items()
+                        if name != 'CACHE_BACKEND'
+                    },
+                    'DJANGO_ENV': 'prod',
+                    'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+                    'DJANGO_ALLOWED_HOSTS': '127.0.0.1',
+                    'CACHE_LOCATION': os.path.join(directory, 'cache'),
+                    'STATIC_ROOT': static_root,
+                    'MEDIA_ROOT': os.path.join(directory, 'media'),
+                },
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=120,
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            report = json.loads(result.stdout.splitlines()[-1])
+            compressed = [
+                name
+                for _, _, files in os.walk(static_root)
+                for name in files if name.endswith('.css.gz')
+            ]
+        self.assertFalse(report['debug'])
+        self.assertEqual(
+            report['cache'],
+            'django.core.cache.backends.filebased.FileBasedCache',
+        )
+        self.assertEqual(report['statuses'], ['200 OK'])
+        # с DEBUG запросы копились бы в connection.queries
+        self.assertEqual(report['queries'], 0)
+        self.assertLess(report['growth'], 2 ** 20)
+        self.assertGreaterEqual(
+            report['templates'], len(list(template_names()))
+        )
+        self.assertTrue(compressed)
+
+
+@db.read_from_replica
+def read_database(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+def write_post(request):
+    Post.objects.create(author=request.user, text='Пост')
+    return HttpResponse()
+
+
+@db.read_from_replica
+def follow_author(request):
+    Follow.objects.follow(request.user.pk, request.GET['author'])
+    return HttpResponse()
+
+
+@override_settings(DATABASES={
+    **settings.DATABASES,
+    'replica': {
+        **settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'},
+    },
+})
+class ReplicaRouterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def database_for(self, user, method='get'):
+        request = getattr(self.factory, method)('/')
+        request.user = user
+        return db.PrimaryPinMiddleware(read_database)(request).content
+
+    def test_reads_of_get_views_go_to_replica(self):
+        """GET-запросы читают с реплики, остальные — с основной базы."""
+        self.assertEqual(self.database_for(AnonymousUser()), b'replica')
+        self.assertEqual(self.database_for(self.user), b'replica')
+        self.assertEqual(self.database_for(self.user, 'post'), b'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        without_replica = {'default': connection.settings_dict}
+        with override_settings(DATABASES=without_replica):
+            self.assertEqual(self.database_for(self.user), b'default')
+
+    def test_writer_is_pinned_to_primary(self):
+        """После записи пользователь читает с основной базы."""
+        request = self.factory.post('/')
+        request.user = self.user
+        db.PrimaryPinMiddleware(write_post)(request)
+        self.assertEqual(self.database_for(self.user), b'default')
+        self.assertEqual(self.database_for(self.other), b'replica')
+        cache.clear()
+        self.assertEqual(self.database_for(self.user), b'replica')
+
+    def test_follow_is_written_to_primary(self):
+        """Подписка из GET-запроса пишется в основную базу."""
+        request = self.factory.get('/', {'author': self.other.pk})
+        request.user = self.user
+        with CaptureQueriesContext(connections['default']) as queries:
+            db.PrimaryPinMiddleware(follow_author)(request)
+        self.assertIn('INSERT', queries[0]['sql'])
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.other).exists()
+        )
+        self.assertEqual(self.database_for(self.user), b'default')
+
+    def test_changed_pages_are_rendered_from_primary(self):
+        """Изменённая страница перерисовывается по основной базе."""
+        view = db.read_from_replica(caching.cache_posts_page('all')(
+            lambda request: HttpResponse(router.db_for_read(Post))
+        ))
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).content, b'replica')
+        self.assertFalse(caching.recently_bumped('all'))
+        caching.bump('all')
+        self.assertTrue(caching.recently_bumped('all'))
+        self.assertEqual(view(request).content, b'default')
+
+    def test_changed_uncached_pages_are_read_from_primary(self):
+        """Изменённая страница без кеша страниц тоже читается с основной."""
+        view = db.read_from_replica(caching.conditional_posts_page(
+            lambda: ['post:1']
+        )(lambda request: HttpResponse(router.db_for_read(Post))))
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).content, b'replica')
+        caching.bump('post:1')
+        self.assertEqual(view(request).content, b'default')
@@ -0,0 +1,58 @@
+"""Writes shared by the HTML views and the JSON API.
+
+Each keeps the counters, the feeds and the cached pages in step with
+the change it makes; the counters of posts and comments are kept by
+the receivers in signals, which also see the admin and the cascades.
+"""
+from django.db import transaction
+
+from . import caching, counters, feed, follows
+from .models import Follow
+
+
+def publish_post(post):
+    # the counter shifted by post_save is committed with the post
+    with transaction.atomic():
+        post.save()
+    feed.push_post(post)
+
+
+def delete_post(post):
+    post.delete()
+
+
+def add_comment(comment):
+    # the counter shifted by post_save is committed with the comment
+    with transaction.atomic():
+        comment.save()
+
+
+def follow(user, author):
+    """Follow an author; False if the user already did or is the author."""
+    if user == author:
+        return False
+    with transaction.atomic():
+        created = Follow.objects.follow(user.pk, author.pk)
+        if created:
+            counters.change_user(user.pk, following_count=1)
+            counters.change_user(author.pk, followers_count=1)
+            feed.update_celebrity(author)
+    if created:
+        follows.invalidate(user.pk)
+        caching.bump(f'author:{author.username}')
+        feed.backfill(user, author)
+    return created
+
+
+def unfollow(user, author):
+    with transaction.atomic():
+        deleted = Follow.objects.unfollow(user.pk, author.pk)
+        if deleted:
+            counters.change_user(user.pk, following_count=-1)
+            counters.change_user(author.pk, followers_count=-1)
+            feed.update_celebrity(author)
+    if deleted:
+        follows.invalidate(user.pk)
+        caching.bump(f'author:{author.username}')
+    feed.prune(user, author)
+    return deleted
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import Group, Post
 
@@ -16,6 +17,12 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def changelist_view(self, request, extra_context=None):
+        # list_editable saves the rows one by one; in one transaction the
+        # search index is updated once for all of them
+        with transaction.atomic():
+            return super().changelist_view(request, extra_context)
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -0,0 +1,295 @@
+import hashlib
+import math
+import random
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core import db
+
+XFETCH_BETA = 1.0
+LOCK_POLL_INTERVAL = 0.05
+# generations first seen by a page live this long unless it renders, so
+# requests for groups and users that do not exist leave nothing behind
+PROVISIONAL_GENERATION_TIMEOUT = 60
+
+
+def _generation_key(scope):
+    return f'posts:generation:{scope}'
+
+
+def _modified_key(scope):
+    return f'posts:modified:{scope}'
+
+
+def generations(*scopes, provisional=False):
+    """Current generation of every scope, e.g. 'all' or 'group:<slug>'.
+
+    A generation only ever grows, so a page cached under an old one is
+    never served again and is left to expire on its own. A provisional
+    generation is created for a short while only, see keep().
+    """
+    timeout = (
+        PROVISIONAL_GENERATION_TIMEOUT if provisional
+        else settings.POSTS_GENERATION_TIMEOUT
+    )
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for scope, key in zip(scopes, keys):
+        if key not in found:
+            # start from the clock, so a generation evicted from the cache
+            # never comes back with a value that was already used
+            cache.add(key, time.time_ns(), timeout)
+            cache.add(_modified_key(scope), time.time(), timeout)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def keep(*scopes):
+    """Keep the generations of scopes that a page was rendered for."""
+    for scope in scopes:
+        cache.touch(_generation_key(scope), settings.POSTS_GENERATION_TIMEOUT)
+        cache.touch(_modified_key(scope), settings.POSTS_GENERATION_TIMEOUT)
+
+
+def last_modified(*scopes):
+    """When one of the scopes last changed, None if that is unknown."""
+    found = cache.get_many([_modified_key(scope) for scope in scopes])
+    if len(found) < len(scopes):
+        return None
+    return max(found.values())
+
+
+def _bumped_key(scope):
+    return f'posts:bumped:{scope}'
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), settings.POSTS_GENERATION_TIMEOUT)
+        else:
+            # BaseCache.incr, used by the file and db backends, sets the key
+            # again with the default timeout
+            cache.touch(key, settings.POSTS_GENERATION_TIMEOUT)
+    cache.set_many(
+        {_modified_key(scope): time.time() for scope in scopes},
+        settings.POSTS_GENERATION_TIMEOUT,
+    )
+    if db.has_replica():
+        cache.set_many(
+            {_bumped_key(scope): True for scope in scopes},
+            settings.REPLICA_PIN_SECONDS,
+        )
+
+
+def recently_bumped(*scopes):
+    """Whether the replica may still miss a change of one of the scopes."""
+    if not db.has_replica():
+        return False
+    return bool(cache.get_many([_bumped_key(scope) for scope in scopes]))
+
+
+def page_key(request, scope_generations=None):
+    """Key of a page; without generations, the key of its latest copy."""
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = f'{request.get_full_path()}|{user}|{scope_generations}'
+    return 'posts:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def validators(request, scope_generations, scopes):
+    """ETag and Last-Modified of a page, read from the cache alone."""
+    etag = '"%s"' % page_key(request, scope_generations).rsplit(':', 1)[1]
+    return etag, last_modified(*scopes)
+
+
+def not_modified(request, etag, modified):
+    """The 304 response when the client's copy of the page is current."""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=None if modified is None else int(modified),
+    )
+
+
+def set_validators(response, etag, modified):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if modified is not None:
+            response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def conditional_posts_page(get_scopes):
+    """Answer 304 before the view runs if the page has not changed since.
+
+    get_scopes(**kwargs) returns the scopes of the page, or None if the
+    page does not exist. The validators are derived from the scopes'
+    generations, so a bump of any of them changes the ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scopes = None
+            if request.method in ('GET', 'HEAD'):
+                scopes = get_scopes(**kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            etag, modified = validators(request, generations(*scopes), scopes)
+            response = not_modified(request, etag, modified)
+            if response is None:
+                # a lagging replica would render the old page under the
+                # new ETag, and the client would keep it until the next bump
+                reads = (
+                    db.primary() if recently_bumped(*scopes)
+                    else nullcontext()
+                )
+                with reads:
+                    response = view(request, *args, **kwargs)
+            return set_validators(response, etag, modified)
+        return wrapper
+    return decorator
+
+
+class CachedPage:
+    def __init__(self, response, expires, delta, validators):
+        self.content = response.content
+        self.content_type = response['Content-Type']
+        self.expires = expires
+        self.delta = delta
+        # of the generation the page was rendered under, which a copy
+        # handed out after a bump must keep
+        self.validators = validators
+
+    def response(self):
+        return set_validators(
+            HttpResponse(self.content, content_type=self.content_type),
+            *self.validators,
+        )
+
+    def is_fresh(self):
+        """Expiry check with probabilistic early recomputation (XFetch).
+
+        The closer the entry is to its expiry and the longer it took to
+        render, the likelier one request refreshes it early, so a busy
+        page is regenerated before it expires for everyone at once.
+        """
+        if self.expires is None:
+            return True
+        early = self.delta * XFETCH_BETA * -math.log(1 - random.random())
+        return time.time() + early < self.expires
+
+
+def _regenerate(view, request, args, kwargs, keys, scopes, page_validators):
+    key, latest_key = keys
+    start = time.time()
+    # a page rendered from a lagging replica would be cached for good
+    reads = db.primary() if recently_bumped(*scopes) else nullcontext()
+    with reads:
+        response = view(request, *args, **kwargs)
+    if response.status_code == 200 and not response.cookies:
+        timeout = settings.POSTS_PAGE_CACHE_TIMEOUT
+        expires = None if timeout is None else start + timeout
+        page = CachedPage(
+            response, expires, time.time() - start, page_validators
+        )
+        stale_timeout = settings.POSTS_PAGE_STALE_TIMEOUT
+        cache.set_many(
+            {key: page, latest_key: page},
+            stale_timeout if timeout is None else timeout + stale_timeout,
+        )
+        keep(*scopes)
+    return set_validators(response, *page_validators)
+
+
+def _wait_for(key, lock_key):
+    """The page the holder of lock_key caches, None if it caches none.
+
+    A holder whose view failed or returned a page that is not cached
+    releases the lock without storing anything, and the waiters stop.
+    """
+    deadline = time.time() + settings.POSTS_PAGE_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        found = cache.get_many([key, lock_key])
+        if key in found:
+            return found[key]
+        if lock_key not in found:
+            return None
+    return None
+
+
+def cache_posts_page(*scopes):
+    """Cache a page until one of its scopes is bumped.
+
+    Scopes are formatted with the view kwargs:
+    ``@cache_posts_page('all', 'group:{slug}')``.
+
+    Only one request regenerates a missing or expired page: it takes a
+    lock with cache.add(), while the others get the previous copy of the
+    page, or wait for the new one if there is no copy at all. The lock
+    holds across workers only where add() is atomic, as in redis: the
+    file backend checks and writes the key in two steps.
+
+    A client holding the current page gets 304 without it being read.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            page_scopes = [scope.format(**kwargs) for scope in scopes]
+            scope_generations = generations(*page_scopes, provisional=True)
+            etag, modified = validators(
+                request, scope_generations, page_scopes
+            )
+            response = not_modified(request, etag, modified)
+            if response is not None:
+                return set_validators(response, etag, modified)
+            return _cached_response(
+                view, request, args, kwargs, page_scopes,
+                page_key(request, scope_generations), (etag, modified),
+            )
+        return wrapper
+    return decorator
+
+
+def _cached_response(view, request, args, kwargs, scopes, key,
+                     page_validators):
+    """The page under key, with the validators of the copy it returns.
+
+    A copy of an older generation keeps its own validators, so a client
+    revalidating it gets the new page as soon as it is cached.
+    """
+    page = cache.get(key)
+    if page is not None and page.is_fresh():
+        return page.response()
+
+    keys = (key, page_key(request))
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.POSTS_PAGE_LOCK_TIMEOUT):
+        try:
+            # the previous holder of the lock may have just finished
+            page = cache.get(key)
+            if page is not None and page.is_fresh():
+                return page.response()
+            return _regenerate(
+                view, request, args, kwargs, keys, scopes, page_validators
+            )
+        finally:
+            cache.delete(lock_key)
+
+    page = page or cache.get(keys[1]) or _wait_for(key, lock_key)
+    if page is not None:
+        return page.response()
+    return set_validators(view(request, *args, **kwargs), *page_validators)
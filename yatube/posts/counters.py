@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.db.models import (Count, F, IntegerField, OuterRef, Q, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def _count_of(queryset, field):
+    """Correlated COUNT(*) of queryset rows whose field points at OuterRef."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()), Value(0)
+    )
+
+
+def recount_user(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+            'following_count': Follow.objects.filter(
+                user_id=user_id
+            ).count(),
+        }
+    )
+    return stats
+
+
+def stats_for(user):
+    try:
+        return UserStats.objects.get(user_id=user.pk)
+    except UserStats.DoesNotExist:
+        return recount_user(user.pk)
+
+
+def change_user(user_id, **deltas):
+    """Shift counters by deltas; must be called inside a transaction."""
+    if not shift_user(user_id, **deltas):
+        recount_user(user_id)
+
+
+def shift_user(user_id, **deltas):
+    """Shift counters by deltas if the user has them; False if not.
+
+    Deletes use it as is: in a cascade the counters of the user may be
+    gone already, and a recount would bring them back for a deleted user.
+    """
+    return bool(UserStats.objects.filter(user_id=user_id).update(**{
+        # a counter behind the rows must not drop below zero
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+    }))
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, Value(0))
+    )
+
+
+def forget_follows(user_id):
+    """Shift the counters of the follows a deleted user takes along.
+
+    The cascade removes them in one DELETE, which sends no signals.
+    """
+    UserStats.objects.filter(
+        user_id__in=Follow.objects.filter(user_id=user_id).values('author')
+    ).update(
+        followers_count=Greatest(F('followers_count') - 1, Value(0))
+    )
+    UserStats.objects.filter(
+        user_id__in=Follow.objects.filter(author_id=user_id).values('user')
+    ).update(
+        following_count=Greatest(F('following_count') - 1, Value(0))
+    )
+
+
+def repair():
+    """Recompute every counter, returning how many rows had drifted."""
+    posts = Post.objects.annotate(
+        actual=_count_of(Comment.objects.all(), 'post')
+    ).filter(~Q(comments_count=F('actual')))
+    repaired = 0
+    for post in posts.only('pk').iterator():
+        Post.objects.filter(pk=post.pk).update(comments_count=post.actual)
+        repaired += 1
+
+    users = User.objects.annotate(
+        posts_total=_count_of(Post.objects.all(), 'author'),
+        followers_total=_count_of(Follow.objects.all(), 'author'),
+        following_total=_count_of(Follow.objects.all(), 'user'),
+        posts_count=Coalesce('stats__posts_count', Value(-1)),
+        followers_count=Coalesce('stats__followers_count', Value(-1)),
+        following_count=Coalesce('stats__following_count', Value(-1)),
+    ).filter(
+        ~Q(posts_count=F('posts_total'))
+        | ~Q(followers_count=F('followers_total'))
+        | ~Q(following_count=F('following_total'))
+    )
+    for user in users.only('pk').iterator():
+        UserStats.objects.update_or_create(
+            user_id=user.pk,
+            defaults={
+                'posts_count': user.posts_total,
+                'followers_count': user.followers_total,
+                'following_count': user.following_total,
+            }
+        )
+        repaired += 1
+    return repaired
@@ -0,0 +1,237 @@
+import heapq
+import math
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .follows import following_ids
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 500
+
+
+def _push(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def is_celebrity(author_id):
+    """Authors at the follower threshold are pulled on read, not pushed."""
+    if settings.FEED_CELEBRITY_THRESHOLD is None:
+        return False
+    return UserStats.objects.filter(
+        user_id=author_id, celebrity=True
+    ).exists()
+
+
+def celebrities_followed_by(user):
+    if settings.FEED_CELEBRITY_THRESHOLD is None:
+        return []
+    followed = following_ids(user.pk)
+    if not followed:
+        return []
+    return list(
+        UserStats.objects.filter(
+            user_id__in=followed, celebrity=True
+        ).values_list('user_id', flat=True)
+    )
+
+
+def _mark_celebrities(stats):
+    """Update the celebrity flags of stats; how many authors left them.
+
+    An author becomes a celebrity at FEED_CELEBRITY_THRESHOLD followers
+    and stops being one only below FEED_CELEBRITY_EXIT_RATIO of it.
+    """
+    threshold = settings.FEED_CELEBRITY_THRESHOLD
+    if threshold is None:
+        return 0
+    stats.filter(
+        celebrity=False, followers_count__gte=threshold
+    ).update(celebrity=True)
+    return stats.filter(
+        celebrity=True,
+        followers_count__lt=math.ceil(
+            threshold * settings.FEED_CELEBRITY_EXIT_RATIO
+        ),
+    ).update(celebrity=False)
+
+
+def push_post(post):
+    """Fan a freshly published post out to the author's followers."""
+    if not settings.FEED_TIMELINE or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _push(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user, author):
+    """Copy the posts of a newly followed author into the user's feed."""
+    if not settings.FEED_TIMELINE or is_celebrity(author.pk):
+        return
+    posts = author.posts.values_list('pk', 'pub_date')
+    _push(
+        TimelineEntry(user=user, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def update_celebrities():
+    """Set the celebrity flags of all authors, e.g. for a new threshold."""
+    return _mark_celebrities(UserStats.objects.all())
+
+
+def update_celebrity(author):
+    """Move an author across the threshold after a follow or an unfollow.
+
+    Runs in the transaction that changed the follower counter. An author
+    who stops being a celebrity gets the latest FEED_CELEBRITY_EXIT_POSTS
+    posts pushed after the commit; backfill_timelines pushes the rest.
+    """
+    left = _mark_celebrities(UserStats.objects.filter(user_id=author.pk))
+    if left and settings.FEED_TIMELINE:
+        transaction.on_commit(lambda: _push_latest(author.pk))
+
+
+def _push_latest(author_id):
+    posts = list(
+        Post.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', 'pub_date')[:settings.FEED_CELEBRITY_EXIT_POSTS]
+    )
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    _push(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for user_id in followers.iterator()
+        for pk, pub_date in posts
+    )
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Push the posts of every existing follow into the timelines.
+
+    Follows made while FEED_TIMELINE was off have no timeline entries, so
+    this runs once before it is turned on. Follows are read batch_size at
+    a time, entries that already exist are kept. Returns the number of
+    follows read.
+    """
+    celebrities = set()
+    if settings.FEED_CELEBRITY_THRESHOLD is not None:
+        # the threshold may have changed since the flags were set
+        update_celebrities()
+        celebrities = set(UserStats.objects.filter(
+            celebrity=True
+        ).values_list('user_id', flat=True))
+    follows = Follow.objects.order_by('pk').values_list(
+        'pk', 'user_id', 'author_id'
+    )
+    total = 0
+    last_pk = 0
+    while True:
+        batch = list(follows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return total
+        total += len(batch)
+        last_pk = batch[-1][0]
+        followers = defaultdict(list)
+        for _, user_id, author_id in batch:
+            if author_id not in celebrities:
+                followers[author_id].append(user_id)
+        for author_id, user_ids in followers.items():
+            posts = Post.objects.filter(author_id=author_id).values_list(
+                'pk', 'pub_date'
+            )
+            _push(
+                TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts.iterator()
+                for user_id in user_ids
+            )
+
+
+def prune(user, author):
+    """Drop the posts of an unfollowed author from the user's feed."""
+    if not settings.FEED_TIMELINE:
+        return
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+class MergedFeed:
+    """Several querysets with the same ordering seen as a single one.
+
+    Implements just what Paginator and KeysetPaginator use: count(),
+    exists(), filter(), order_by() and slicing. A slice [a:b] reads at
+    most b rows from every source and heap-merges them, so a page never
+    materializes the whole feed.
+    """
+
+    def __init__(self, *querysets, ordering=('-pub_date', '-pk')):
+        self.ordering = ordering
+        self.querysets = [qs.order_by(*ordering) for qs in querysets]
+
+    def count(self):
+        return sum(qs.count() for qs in self.querysets)
+
+    def exists(self):
+        return any(qs.exists() for qs in self.querysets)
+
+    def filter(self, *args, **kwargs):
+        return MergedFeed(
+            *(qs.filter(*args, **kwargs) for qs in self.querysets),
+            ordering=self.ordering
+        )
+
+    def order_by(self, *ordering):
+        return MergedFeed(*self.querysets, ordering=ordering)
+
+    def _key(self, post):
+        return tuple(
+            getattr(post, field.lstrip('-')) for field in self.ordering
+        )
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        merged = heapq.merge(
+            *(qs[:index.stop] for qs in self.querysets),
+            key=self._key,
+            reverse=self.ordering[0].startswith('-'),
+        )
+        return list(islice(merged, start, index.stop))
+
+
+def feed_for(user):
+    if not settings.FEED_TIMELINE:
+        followed = following_ids(user.pk)
+        if len(followed) > settings.FOLLOW_IN_LIMIT:
+            return Post.objects.for_listing().filter(
+                author__following__user=user
+            )
+        return Post.objects.for_listing().filter(author__in=followed)
+
+    timeline = Post.objects.for_listing().filter(timeline_entries__user=user)
+    celebrities = celebrities_followed_by(user)
+    if not celebrities:
+        # F() keeps the post id column, a field name would sort by the
+        # ordering of Post instead
+        return timeline.order_by(
+            F('timeline_entries__pub_date').desc(),
+            F('timeline_entries__post').desc(),
+        )
+    return MergedFeed(
+        timeline.exclude(author__in=celebrities),
+        Post.objects.for_listing().filter(author__in=celebrities),
+    )
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import caching
+from .models import Follow
+
+_lock = threading.Lock()
+# user id -> (generation, expires, author ids), least recently used first
+_local = OrderedDict()
+
+
+def _scope(user_id):
+    return f'following:{user_id}'
+
+
+def _remember(user_id, generation, author_ids):
+    with _lock:
+        _local[user_id] = (
+            generation,
+            time.monotonic() + settings.FOLLOW_LOCAL_TIMEOUT,
+            author_ids,
+        )
+        _local.move_to_end(user_id)
+        while len(_local) > settings.FOLLOW_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def following_ids(user_id):
+    """Ids of the authors a user follows.
+
+    Read from a per-process LRU, then the shared cache, then the database.
+    Every read checks the generation of the set in the shared cache, so a
+    follow made in another process is seen at once, while the set itself
+    is only fetched when it changed.
+    """
+    generation, = caching.generations(_scope(user_id))
+    with _lock:
+        entry = _local.get(user_id)
+        if (entry is not None and entry[0] == generation
+                and entry[1] > time.monotonic()):
+            _local.move_to_end(user_id)
+            return entry[2]
+
+    key = f'posts:following:{user_id}:{generation}'
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = frozenset(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, author_ids, settings.FOLLOW_CACHE_TIMEOUT)
+    _remember(user_id, generation, author_ids)
+    return author_ids
+
+
+def is_following(user, author):
+    return user.is_authenticated and author.pk in following_ids(user.pk)
+
+
+def invalidate(user_id):
+    caching.bump(_scope(user_id))
+    with _lock:
+        _local.pop(user_id, None)
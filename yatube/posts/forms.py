@@ -1,9 +1,22 @@
 from django import forms
+from django.core.exceptions import ValidationError
 
 from .models import Comment, Post
+from .uploads import validate_image_header
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, upload_error=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_error = upload_error
+        self.fields['image'].validators.append(validate_image_header)
+
+    def clean_image(self):
+        # set by ImageUploadHandler when it cut the upload off
+        if self.upload_error:
+            raise ValidationError(self.upload_error, code='image_too_large')
+        return self.cleaned_data['image']
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
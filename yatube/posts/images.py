@@ -0,0 +1,49 @@
+import os
+
+from PIL import Image
+
+SAVE_OPTIONS = {
+    'jpeg': {'format': 'JPEG', 'progressive': True, 'optimize': True},
+    'webp': {'format': 'WEBP', 'method': 4},
+}
+
+
+def variant_name(image_format, size):
+    return f'{image_format}-{size}'
+
+
+def optimize_image(media_root, source, target_dir, variants, quality):
+    """Re-encode one upload into every (format, max side) variant.
+
+    Runs in a worker process, so it touches files only and returns plain
+    data for the parent to record.
+    """
+    path = os.path.join(media_root, source)
+    stat = os.stat(path)
+    results = []
+    with Image.open(path) as original:
+        original = original.convert('RGB')
+        for image_format, size in variants:
+            image = original.copy()
+            # keeps the aspect ratio and never upscales
+            image.thumbnail((size, size), Image.LANCZOS)
+            stem = os.path.splitext(source)[0]
+            name = os.path.join(
+                target_dir, f'{stem}-{size}.{image_format}'
+            )
+            target = os.path.join(media_root, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            image.save(
+                target, quality=quality, **SAVE_OPTIONS[image_format]
+            )
+            results.append({
+                'source': source,
+                'variant': variant_name(image_format, size),
+                'name': name,
+                'source_size': stat.st_size,
+                'source_mtime': stat.st_mtime,
+                'size': os.path.getsize(target),
+                'width': image.width,
+                'height': image.height,
+            })
+    return results
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Раскладывает посты по лентам всех существующих подписок; '
+        'запускается перед включением FEED_TIMELINE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=feed.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        total = feed.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано подписок: {total}'
+        ))
@@ -0,0 +1,118 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.images import SAVE_OPTIONS, optimize_image, variant_name
+from posts.models import ImageDerivative
+
+SOURCE_DIR = 'posts'
+TARGET_DIR = 'optimized'
+
+
+def megabytes(size):
+    return f'{size / 2 ** 20:.2f} МБ'
+
+
+class Command(BaseCommand):
+    help = (
+        'Пережимает картинки постов в прогрессивный JPEG и WebP '
+        'ограниченного размера на всех ядрах процессора'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1280, 640],
+            help='наибольшая сторона картинки для каждого варианта'
+        )
+        parser.add_argument(
+            '--formats', nargs='+', choices=sorted(SAVE_OPTIONS),
+            default=['jpeg', 'webp']
+        )
+        parser.add_argument('--quality', type=int, default=80)
+
+    def find_work(self, variants):
+        """Uploads missing a variant, or changed since it was made."""
+        done = {
+            (source, variant): (size, mtime)
+            for source, variant, size, mtime
+            in ImageDerivative.objects.values_list(
+                'source', 'variant', 'source_size', 'source_mtime'
+            ).iterator()
+        }
+        media_root = settings.MEDIA_ROOT
+        for dirpath, _, filenames in os.walk(
+            os.path.join(media_root, SOURCE_DIR)
+        ):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                source = os.path.relpath(path, media_root)
+                stat = os.stat(path)
+                missing = [
+                    variant for variant in variants
+                    if done.get((source, variant_name(*variant)))
+                    != (stat.st_size, stat.st_mtime)
+                ]
+                yield source, missing
+
+    def handle(self, *args, **options):
+        variants = [
+            (image_format, size)
+            for image_format in options['formats']
+            for size in options['sizes']
+        ]
+        work = list(self.find_work(variants))
+        todo = [(source, missing) for source, missing in work if missing]
+
+        source_bytes = 0
+        variant_bytes = defaultdict(lambda: [0, 0])
+        failed = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(options['workers']) as pool:
+            futures = {
+                pool.submit(
+                    optimize_image, settings.MEDIA_ROOT, source, TARGET_DIR,
+                    missing, options['quality']
+                ): source
+                for source, missing in todo
+            }
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {error}')
+                    continue
+                # recorded file by file, so an interrupted run resumes here
+                for result in results:
+                    ImageDerivative.objects.update_or_create(
+                        source=result['source'],
+                        variant=result['variant'],
+                        defaults=result,
+                    )
+                    totals = variant_bytes[result['variant']]
+                    totals[0] += result['source_size']
+                    totals[1] += result['size']
+                source_bytes += results[0]['source_size']
+        elapsed = time.perf_counter() - start
+
+        processed = len(todo) - failed
+        self.stdout.write(
+            f'Обработано: {processed}, пропущено: {len(work) - len(todo)}, '
+            f'ошибок: {failed}'
+        )
+        for variant, (before, after) in sorted(variant_bytes.items()):
+            self.stdout.write(
+                f'{variant}: {megabytes(before)} -> {megabytes(after)}, '
+                f'сэкономлено {megabytes(before - after)}'
+            )
+        if processed and elapsed:
+            self.stdout.write(
+                f'Скорость: {processed / elapsed:.1f} файлов/с, '
+                f'{megabytes(source_bytes / elapsed)}/с'
+            )
+        self.stdout.write(self.style.SUCCESS('Готово'))
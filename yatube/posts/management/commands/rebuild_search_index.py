@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов, читая таблицу частями'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=search.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        total = search.rebuild(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {total}'
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_auto_20261017_0633'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Исходный файл')),
+                ('variant', models.CharField(max_length=32, verbose_name='Вариант')),
+                ('name', models.CharField(max_length=255, verbose_name='Файл')),
+                ('source_size', models.PositiveIntegerField(verbose_name='Размер исходного файла')),
+                ('source_mtime', models.FloatField(verbose_name='Время изменения исходного файла')),
+                ('size', models.PositiveIntegerField(verbose_name='Размер файла')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='imagederivative',
+            constraint=models.UniqueConstraint(fields=('source', 'variant'), name='unique_image_derivative'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+from collections import Counter
+
+
+BATCH_SIZE = 500
+
+
+def index_posts(apps, schema_editor):
+    # posts are read and indexed by chunks of the primary key, so only one
+    # chunk of entries is held in memory at a time
+    Post = apps.get_model('posts', 'Post')
+    SearchEntry = apps.get_model('posts', 'SearchEntry')
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    last_pk = 0
+    while True:
+        rows = list(posts.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        entries = []
+        for pk, text in rows:
+            words = re.findall(r'\w+', text.lower().replace('ё', 'е'))
+            entries.extend(
+                SearchEntry(term=term, post_id=pk, count=count)
+                for term, count in Counter(
+                    word for word in words if len(word) <= 64
+                ).items()
+            )
+        SearchEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_auto_20261017_0640'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('count', models.PositiveIntegerField(verbose_name='Сколько раз встречается')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_entry'),
+        ),
+        migrations.RunPython(index_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-17 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 500
+
+
+def count_of(model, field):
+    counts = model.objects.filter(
+        **{field: models.OuterRef('pk')}
+    ).order_by().values(field).annotate(
+        total=models.Count('pk')
+    ).values('total')
+    return Coalesce(
+        models.Subquery(counts, output_field=models.IntegerField()), 0
+    )
+
+
+def fill_user_stats(apps, schema_editor):
+    # users created before 0014 have no counters, and the feed would take
+    # a large author without them for a regular one
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    missing = User.objects.filter(stats__isnull=True).order_by('pk').annotate(
+        posts_total=count_of(Post, 'author'),
+        followers_total=count_of(Follow, 'author'),
+        following_total=count_of(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    # the rows of a batch drop out of missing once they are written
+    batch = list(missing[:BATCH_SIZE])
+    while batch:
+        UserStats.objects.bulk_create(
+            UserStats(
+                user_id=pk,
+                posts_count=posts,
+                followers_count=followers,
+                following_count=following,
+            )
+            for pk, posts, followers, following in batch
+        )
+        batch = list(missing[:BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_auto_20261017_0700'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-17 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    threshold = settings.FEED_CELEBRITY_THRESHOLD
+    if threshold is None:
+        return
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.filter(followers_count__gte=threshold).update(
+        celebrity=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_auto_20261017_1120'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='celebrity',
+            field=models.BooleanField(default=False, verbose_name='Знаменитость'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, router
 
 User = get_user_model()
 
@@ -13,6 +13,21 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Posts with everything a post list renders fetched in one query."""
+        return self.select_related('author', 'group').defer(
+            'author__password',
+            'author__last_login',
+            'author__is_superuser',
+            'author__email',
+            'author__is_staff',
+            'author__is_active',
+            'author__date_joined',
+            'group__description',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -44,8 +59,27 @@ class Post(models.Model):
         blank=True
     )
 
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date', ]
+        # the pk breaks ties the way keyset pagination orders them
+        indexes = [
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -75,11 +109,41 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created', ]
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class FollowQuerySet(models.QuerySet):
+    def follow(self, user_id, author_id):
+        """Add a follow in a single INSERT; True if it did not exist.
+
+        ON CONFLICT DO NOTHING leans on unique_follow, so parallel
+        requests never create a duplicate and no read is needed first.
+        """
+        # self.db is the read database, the replica in read_from_replica
+        connection = connections[self._db or router.db_for_write(self.model)]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, author_id) VALUES (%s, %s) '
+                'ON CONFLICT DO NOTHING',
+                [user_id, author_id],
+            )
+            return cursor.rowcount == 1
+
+    def unfollow(self, user_id, author_id):
+        """Remove a follow in a single DELETE; True if there was one."""
+        deleted, _ = self.filter(user_id=user_id, author_id=author_id).delete()
+        return bool(deleted)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -94,8 +158,138 @@ class Follow(models.Model):
         verbose_name='Автор'
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
-        models.UniqueConstraint(
-            fields=['user', 'author'],
-            name='unique_follow'
-        )
+        # its index also serves the lookups by user and by (user, author)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into a follower's feed when it was published."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    # copy of post.pub_date, so the feed is read from this table alone
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Counters kept up to date by the views instead of COUNT(*) per page."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0
+    )
+    celebrity = models.BooleanField(
+        verbose_name='Знаменитость',
+        default=False
+    )
+
+
+class ImageDerivative(models.Model):
+    """A re-encoded copy of an uploaded image made by optimize_images."""
+    source = models.CharField(
+        verbose_name='Исходный файл',
+        max_length=255
+    )
+    variant = models.CharField(
+        verbose_name='Вариант',
+        max_length=32
+    )
+    name = models.CharField(
+        verbose_name='Файл',
+        max_length=255
+    )
+    source_size = models.PositiveIntegerField(
+        verbose_name='Размер исходного файла'
+    )
+    source_mtime = models.FloatField(
+        verbose_name='Время изменения исходного файла'
+    )
+    size = models.PositiveIntegerField(verbose_name='Размер файла')
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'variant'],
+                name='unique_image_derivative'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class SearchEntry(models.Model):
+    """One word of a post in the inverted index used by the search."""
+    term = models.CharField(
+        verbose_name='Слово',
+        max_length=64
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_entries',
+        verbose_name='Пост'
+    )
+    count = models.PositiveIntegerField(
+        verbose_name='Сколько раз встречается'
+    )
+
+    class Meta:
+        constraints = [
+            # its index starts with the term, so it holds the posting lists
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_entry'
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,123 @@
+import base64
+import binascii
+from collections.abc import Mapping, Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.rsplit('|', 1)
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+
+
+class KeysetPaginator:
+    """Pages through a queryset ordered by (key_field, pk) descending.
+
+    Instead of OFFSET each page filters on the last row of the previous
+    one, so the cost of a page does not depend on how deep it is and no
+    COUNT(*) is issued to render it.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, key_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key_field = key_field
+
+    @cached_property
+    def count(self):
+        return self.object_list.count()
+
+    def get_page(self, after=None, before=None):
+        """Return a page, falling back to the first one on a bad cursor."""
+        try:
+            return self.page(after=after, before=before)
+        except InvalidCursor:
+            return self.page()
+
+    def page(self, after=None, before=None):
+        field = self.key_field
+        if before:
+            value, pk = decode_cursor(before)
+            rows = self.object_list.filter(
+                Q(**{f'{field}__gt': value})
+                | Q(**{field: value, 'pk__gt': pk})
+            ).order_by(field, 'pk')
+            rows = list(rows[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(rows, self, has_previous, True)
+
+        rows = self.object_list.order_by(f'-{field}', '-pk')
+        if after:
+            value, pk = decode_cursor(after)
+            rows = rows.filter(
+                Q(**{f'{field}__lt': value})
+                | Q(**{field: value, 'pk__lt': pk})
+            )
+        rows = list(rows[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], self, bool(after), has_next)
+
+    def cursor_for(self, obj):
+        # rows of a values() queryset have to include 'pk'
+        if isinstance(obj, Mapping):
+            return encode_cursor(obj[self.key_field], obj['pk'])
+        return encode_cursor(getattr(obj, self.key_field), obj.pk)
+
+
+class KeysetPage(Sequence):
+    def __init__(self, object_list, paginator, previous, following):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_previous = previous
+        self._has_next = following
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.cursor_for(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.cursor_for(self.object_list[0])
+        return None
@@ -0,0 +1,137 @@
+import math
+import re
+import threading
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Max, Sum, When)
+
+from .models import Post, SearchEntry
+
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = SearchEntry._meta.get_field('term').max_length
+MAX_QUERY_TERMS = 10
+# posts written per batch, kept under the SQLite limit of query variables
+BATCH_SIZE = 500
+
+_local = threading.local()
+
+
+def tokenize(text):
+    """Lowercased words of a text, 'ё' folded into 'е'."""
+    return [
+        word for word in WORD_RE.findall(text.lower().replace('ё', 'е'))
+        if len(word) <= MAX_TERM_LENGTH
+    ]
+
+
+def entries_for(post_id, text):
+    return [
+        SearchEntry(term=term, post_id=post_id, count=count)
+        for term, count in Counter(tokenize(text)).items()
+    ]
+
+
+def write(rows):
+    """Replace the index entries of (post id, text) rows in one batch."""
+    post_ids = [post_id for post_id, _ in rows]
+    with transaction.atomic():
+        SearchEntry.objects.filter(post_id__in=post_ids).delete()
+        SearchEntry.objects.bulk_create(
+            entry for post_id, text in rows
+            for entry in entries_for(post_id, text)
+        )
+
+
+def reindex(post_ids):
+    post_ids = sorted(post_ids)
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        chunk = post_ids[start:start + BATCH_SIZE]
+        write(list(
+            Post.objects.filter(pk__in=chunk).values_list('pk', 'text')
+        ))
+
+
+def _pending():
+    if not hasattr(_local, 'pending'):
+        _local.pending = set()
+    return _local.pending
+
+
+def schedule(post_id):
+    """Reindex a post once the current transaction commits.
+
+    Posts saved in one transaction are written in a single batch. Every
+    call registers a flush, but the first one takes the whole queue and
+    the rest find it empty, so a rolled back transaction leaves nothing
+    stuck: its posts go with the next flush.
+    """
+    _pending().add(post_id)
+    transaction.on_commit(flush)
+
+
+def flush():
+    pending = _pending()
+    if not pending:
+        return
+    post_ids = list(pending)
+    pending.clear()
+    reindex(post_ids)
+
+
+def rebuild(chunk_size=BATCH_SIZE):
+    """Reindex every post, reading the table in chunks by primary key."""
+    last_pk = 0
+    total = 0
+    while True:
+        rows = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'text'
+            )[:chunk_size]
+        )
+        if not rows:
+            return total
+        write(rows)
+        total += len(rows)
+        last_pk = rows[-1][0]
+
+
+def search(query, group=None, author=None):
+    """Posts matching any word of the query, best matches first.
+
+    Every word weighs its count in the post times its inverse document
+    frequency, so rare words decide the order. Only the posting lists of
+    the query words are read, never the whole table.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return Post.objects.none()
+    frequencies = dict(
+        SearchEntry.objects.filter(term__in=terms).values('term').annotate(
+            posts=Count('post')
+        ).values_list('term', 'posts')
+    )
+    if not frequencies:
+        return Post.objects.none()
+    # the largest id stands in for the number of posts: one index lookup
+    # instead of counting the table
+    total = Post.objects.aggregate(total=Max('pk'))['total'] or 1
+    weights = [
+        When(
+            search_entries__term=term,
+            then=ExpressionWrapper(
+                F('search_entries__count') * math.log(1 + total / posts),
+                output_field=FloatField(),
+            ),
+        )
+        for term, posts in frequencies.items()
+    ]
+    posts = Post.objects.filter(search_entries__term__in=list(frequencies))
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return posts.annotate(
+        rank=Sum(Case(*weights, output_field=FloatField()))
+    ).order_by('-rank', '-pub_date', '-pk')
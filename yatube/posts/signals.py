@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from . import caching, counters, search, thumbnails
+from .models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # a post moved to another group has to drop out of the old group page
+    instance._initial_group_id = instance.__dict__.get('group_id')
+    instance._initial_image = str(instance.__dict__.get('image') or '')
+    instance._initial_text = instance.__dict__.get('text')
+
+
+@receiver(post_save, sender=Post)
+def render_thumbnails(sender, instance, **kwargs):
+    image = str(instance.image or '')
+    if image and image != instance._initial_image:
+        thumbnails.schedule(instance.pk)
+    instance._initial_image = image
+
+
+@receiver(post_save, sender=Post)
+def index_search_terms(sender, instance, created, **kwargs):
+    # deleted posts leave the index by cascade
+    if created or instance.text != instance._initial_text:
+        search.schedule(instance.pk)
+    instance._initial_text = instance.text
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    group_ids = {
+        instance.group_id, getattr(instance, '_initial_group_id', None)
+    }
+    slugs = Group.objects.filter(pk__in=group_ids - {None}).values_list(
+        'slug', flat=True
+    )
+    scopes = [
+        'all',
+        f'author:{instance.author.username}',
+        f'post:{instance.pk}',
+        *(f'group:{slug}' for slug in slugs),
+    ]
+    instance._initial_group_id = instance.group_id
+    # a page read before the commit would be cached as the new generation
+    transaction.on_commit(lambda: caching.bump(*scopes))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    scope = f'post:{instance.post_id}'
+    transaction.on_commit(lambda: caching.bump(scope))
+
+
+# the counters follow every save and delete, including those of the admin
+# and the cascades of a deleted user, not just the ones in actions
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.shift_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(pre_delete, sender=User)
+def uncount_follows(sender, instance, **kwargs):
+    counters.forget_follows(instance.pk)
@@ -0,0 +1,40 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts import caching, thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Rendered cards of a page of posts, from the cache where possible.
+
+    A card is cached under the generation of its 'post:<pk>' scope, which
+    every edit of the post and every new thumbnail bumps. A page costs two
+    get_many, and only the cards missing from the cache are rendered.
+    """
+    posts = list(posts)
+    versions = caching.generations(*(f'post:{post.pk}' for post in posts))
+    keys = [
+        f'posts:card:{post.pk}:{version}'
+        for post, version in zip(posts, versions)
+    ]
+    cards = cache.get_many(keys)
+
+    missing = [post for post, key in zip(posts, keys) if key not in cards]
+    if missing:
+        thumbnails.prefetch(missing)
+        card = get_template(CARD_TEMPLATE)
+        rendered = {
+            key: card.render({'post': post})
+            for post, key in zip(posts, keys) if key not in cards
+        }
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
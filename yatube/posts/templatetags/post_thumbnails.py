@@ -0,0 +1,23 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_thumbnail(post, geometry):
+    """Thumbnail of the post image if it is rendered already, else None.
+
+    Unlike {% thumbnail %} it never decodes the image during the request:
+    a missing thumbnail is queued for the background workers instead.
+    The list views look up the thumbnails of a whole page beforehand.
+    """
+    prefetched = getattr(post, '_thumbnails', {})
+    if geometry in prefetched:
+        image = prefetched[geometry]
+    else:
+        image = thumbnails.lookup(post.image, geometry)
+    if image is None and post.image:
+        thumbnails.schedule(post.pk)
+    return image
@@ -0,0 +1,317 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import caching, counters
+from ..models import Comment, Group, Post
+from ..templatetags import post_cards
+from .utils import commit_callbacks
+
+User = get_user_model()
+
+THREADS = 10
+
+
+def contents(responses):
+    return [response.content.decode() for response in responses]
+
+
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.regenerations = 0
+        self.lock = threading.Lock()
+
+        @caching.cache_posts_page('test')
+        def view(request):
+            with self.lock:
+                self.regenerations += 1
+                number = self.regenerations
+            time.sleep(0.2)
+            return HttpResponse(f'версия {number}')
+
+        self.view = view
+
+    def get(self, **headers):
+        request = RequestFactory().get('/', **headers)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def get_concurrently(self):
+        barrier = threading.Barrier(THREADS)
+        responses = []
+
+        def worker():
+            barrier.wait()
+            responses.append(self.get())
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_cold_cache_is_generated_once(self):
+        """Пустой кеш заполняет один запрос, остальные ждут его."""
+        responses = contents(self.get_concurrently())
+        self.assertEqual(self.regenerations, 1)
+        self.assertEqual(responses, ['версия 1'] * THREADS)
+
+    def test_invalidated_page_is_regenerated_once(self):
+        """После сброса поколения страницу пересобирает один запрос."""
+        self.get()
+        caching.bump('test')
+        responses = contents(self.get_concurrently())
+        self.assertEqual(self.regenerations, 2)
+        self.assertEqual(responses.count('версия 2'), 1)
+        self.assertEqual(responses.count('версия 1'), THREADS - 1)
+
+    def test_stale_copy_keeps_its_validators(self):
+        """Копия прошлого поколения отдаётся со своим ETag."""
+        old_etag = self.get()['ETag']
+        caching.bump('test')
+        etags = {
+            response.content.decode(): response['ETag']
+            for response in self.get_concurrently()
+        }
+        self.assertEqual(etags['версия 1'], old_etag)
+        self.assertNotEqual(etags['версия 2'], old_etag)
+
+        response = self.get(HTTP_IF_NONE_MATCH=old_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), 'версия 2')
+        response = self.get(HTTP_IF_NONE_MATCH=etags['версия 2'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_uncached_page_releases_waiters(self):
+        """Ждущие не висят до таймаута, если страница не попала в кеш."""
+        @caching.cache_posts_page('test')
+        def view(request):
+            time.sleep(0.2)
+            return HttpResponse(status=404)
+
+        self.view = view
+        start = time.time()
+        responses = self.get_concurrently()
+        self.assertLess(
+            time.time() - start, settings.POSTS_PAGE_LOCK_TIMEOUT / 2
+        )
+        self.assertEqual(
+            [response.status_code for response in responses], [404] * THREADS
+        )
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+    def test_expired_page_is_regenerated_once(self):
+        """Истёкшую страницу пересобирает один запрос, прочим — копия."""
+        self.get()
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        key = caching.page_key(request, caching.generations('test'))
+        page = cache.get(key)
+        page.expires = time.time() - 1
+        cache.set(key, page)
+
+        responses = contents(self.get_concurrently())
+        self.assertEqual(self.regenerations, 2)
+        self.assertEqual(responses.count('версия 2'), 1)
+
+    def test_early_expiration(self):
+        """Запись, близкая к истечению, иногда пересобирается заранее."""
+        page = caching.CachedPage(
+            HttpResponse(), expires=time.time() + 1, delta=0.5,
+            validators=('"etag"', None),
+        )
+        with mock.patch('posts.caching.random.random', return_value=0.0):
+            self.assertTrue(page.is_fresh())
+        with mock.patch('posts.caching.random.random', return_value=0.99):
+            self.assertFalse(page.is_fresh())
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        counters.recount_user(cls.author.pk)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_unchanged_page_is_not_modified(self):
+        """Неизменившаяся страница отдаётся ответом 304 без запросов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changed_page_is_sent_again(self):
+        """После изменения страница отдаётся целиком."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        with commit_callbacks():
+            Post.objects.create(
+                author=self.author, group=self.group, text='Ещё'
+            )
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Да'
+            )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_pages_are_bumped_after_commit(self):
+        """Версия страниц меняется только после коммита."""
+        etag = self.client.get(self.urls[0])['ETag']
+        with commit_callbacks():
+            Post.objects.create(author=self.author, text='Ещё')
+            response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_depend_on_user(self):
+        """Версия страницы у каждого пользователя своя."""
+        url = self.urls[-1]
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class PostCardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def cards(self):
+        return post_cards.post_cards(
+            Post.objects.select_related('author', 'group').order_by('pk')
+        )
+
+    def test_cached_cards_are_not_rendered(self):
+        """Закешированные карточки берутся из кеша без рендеринга."""
+        cards = self.cards()
+        self.assertIn('Пост 0', cards[0])
+        with mock.patch.object(post_cards, 'get_template') as get_template:
+            with mock.patch.object(
+                cache, 'get_many', wraps=cache.get_many
+            ) as get_many:
+                self.assertEqual(self.cards(), cards)
+        get_template.assert_not_called()
+        # поколения постов и сами карточки
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_edited_post_card_is_rendered_again(self):
+        """После правки поста рендерится только его карточка."""
+        old_cards = self.cards()
+        post = self.posts[1]
+        post.text = 'Правка'
+        with commit_callbacks():
+            post.save()
+        with mock.patch.object(
+            cache, 'set_many', wraps=cache.set_many
+        ) as set_many:
+            cards = self.cards()
+        self.assertIn('Правка', cards[1])
+        self.assertEqual([cards[0], cards[2]], [old_cards[0], old_cards[2]])
+        self.assertEqual(len(set_many.call_args[0][0]), 1)
+
+
+class PageExpiryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_expire(self):
+        """Страницы лежат в кеше не дольше POSTS_PAGE_STALE_TIMEOUT."""
+        with mock.patch.object(
+            cache, 'set_many', wraps=cache.set_many
+        ) as set_many:
+            self.client.get(reverse('posts:index'))
+        timeouts = {
+            call[0][1] for call in set_many.call_args_list
+            if any(key.startswith('posts:page:') for key in call[0][0])
+        }
+        self.assertEqual(timeouts, {settings.POSTS_PAGE_STALE_TIMEOUT})
+
+    def test_bumped_generation_keeps_its_timeout(self):
+        """Поколение после bump живёт POSTS_GENERATION_TIMEOUT и в файлах."""
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            }},
+        ):
+            caching.generations('all')
+            caching.bump('all')
+            caching.bump('all')
+            later = time.time() + 2 * cache.default_timeout
+            with mock.patch('time.time', return_value=later):
+                self.assertIsNotNone(cache.get('posts:generation:all'))
+
+    def test_missing_scope_is_not_kept(self):
+        """Запросы к несуществующим группам не оставляют поколений."""
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add, \
+                mock.patch.object(cache, 'touch', wraps=cache.touch) as touch:
+            response = self.client.get(
+                reverse('posts:group_list', kwargs={'slug': 'nope'})
+            )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            {call[0][2] for call in add.call_args_list
+             if call[0][0].startswith('posts:generation:')},
+            {caching.PROVISIONAL_GENERATION_TIMEOUT},
+        )
+        touch.assert_not_called()
+
+        with mock.patch.object(cache, 'touch', wraps=cache.touch) as touch:
+            self.client.get(
+                reverse('posts:profile', kwargs={'username': 'author'})
+            )
+        touch.assert_any_call(
+            'posts:generation:author:author', settings.POSTS_GENERATION_TIMEOUT
+        )
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PAGE_SIZE=5)
+class CommentsPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+        )
+        counters.recount_user(cls.user.pk)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': CommentsPageTest.post.pk}
+        )
+
+    def create_comments(self, amount):
+        for _ in range(amount):
+            number = Comment.objects.count()
+            commenter = User.objects.create_user(username=f'user{number}')
+            Comment.objects.create(
+                post=CommentsPageTest.post,
+                author=commenter,
+                text=f'Комментарий {number}',
+            )
+        return list(Comment.objects.order_by('-created', '-pk'))
+
+    def test_queries_do_not_depend_on_comments(self):
+        """Авторы комментариев загружаются вместе с комментариями."""
+        self.create_comments(1)
+        # the first request also looks up the author for the ETag
+        self.guest_client.get(self.url)
+        with self.assertNumQueries(3):
+            self.guest_client.get(self.url)
+        self.create_comments(12)
+        with self.assertNumQueries(3):
+            self.guest_client.get(self.url)
+
+    def test_comments_are_paginated(self):
+        """На странице поста выводится только первая порция комментариев."""
+        comments = self.create_comments(7)
+        response = self.guest_client.get(self.url)
+        page = response.context['comments']
+        self.assertEqual(list(page), comments[:5])
+        self.assertContains(response, f'?after={page.next_cursor}')
+        response = self.guest_client.get(self.url, {'after': page.next_cursor})
+        self.assertEqual(list(response.context['comments']), comments[5:])
+
+    def test_load_more_endpoint(self):
+        """JSON-эндпоинт отдаёт следующую порцию комментариев."""
+        comments = self.create_comments(7)
+        url = reverse(
+            'posts:post_comments',
+            kwargs={'post_id': CommentsPageTest.post.pk}
+        )
+        data = self.guest_client.get(url).json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [comment.pk for comment in comments[:5]],
+        )
+        data = self.guest_client.get(url, {'after': data['next']}).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            [comment.text for comment in comments[5:]],
+        )
+        self.assertIsNone(data['next'])
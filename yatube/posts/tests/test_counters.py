@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(CountersTest.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(CountersTest.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_views_maintain_counters(self):
+        """Счётчики обновляются при публикации, комментарии и подписке."""
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        post = Post.objects.get()
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 1)
+
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        follow_url = reverse(
+            'posts:profile_follow',
+            kwargs={'username': CountersTest.author.username}
+        )
+        self.reader_client.get(follow_url)
+        self.reader_client.get(follow_url)
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 1)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 1)
+
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': CountersTest.author.username}
+        ))
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 0)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 0)
+
+    def test_deletes_outside_views_maintain_counters(self):
+        """Удаление в админке и каскадом тоже уменьшает счётчики."""
+        posts = [
+            Post.objects.create(author=CountersTest.author, text=f'Пост {n}')
+            for n in range(3)
+        ]
+        Comment.objects.create(
+            post=posts[0], author=CountersTest.reader, text='Комментарий'
+        )
+        Follow.objects.follow(CountersTest.reader.pk, CountersTest.author.pk)
+        counters.recount_user(CountersTest.author.pk)
+        counters.recount_user(CountersTest.reader.pk)
+
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        admin_client = Client()
+        admin_client.force_login(admin)
+        admin_client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [posts[2].pk],
+            'post': 'yes',
+        })
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 2)
+        response = self.reader_client.get(reverse(
+            'posts:profile', kwargs={'username': CountersTest.author.username}
+        ))
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+        User.objects.get(pk=CountersTest.reader.pk).delete()
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 0)
+        posts[0].refresh_from_db()
+        self.assertEqual(posts[0].comments_count, 0)
+        self.assertFalse(
+            UserStats.objects.filter(user_id=CountersTest.reader.pk).exists()
+        )
+
+    def test_profile_does_not_count_posts(self):
+        """Профайл берёт число постов из счётчика, а не из COUNT(*)."""
+        Post.objects.create(author=CountersTest.author, text='Пост')
+        counters.recount_user(CountersTest.author.pk)
+        url = reverse(
+            'posts:profile', kwargs={'username': CountersTest.author.username}
+        )
+        with self.assertNumQueries(6) as context:
+            response = self.reader_client.get(url)
+        self.assertFalse(any(
+            'COUNT' in query['sql'] for query in context.captured_queries
+        ))
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertContains(response, 'Всего постов: 1')
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(author=CountersTest.author, text='Пост')
+        Follow.objects.create(
+            user=CountersTest.reader, author=CountersTest.author
+        )
+        UserStats.objects.filter(user=CountersTest.author).update(
+            posts_count=7, followers_count=0
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+        self.assertIn('Исправлено записей: 3', out.getvalue())
+        author_stats = self.stats(CountersTest.author)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+        call_command('recount_counters', stdout=out)
+        self.assertIn('Исправлено записей: 0', out.getvalue())
@@ -0,0 +1,195 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feed, follows
+from ..models import Follow, Post, TimelineEntry, UserStats
+from .utils import commit_callbacks
+
+User = get_user_model()
+
+
+@override_settings(FEED_TIMELINE=True)
+class TimelineFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(TimelineFeedTest.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineFeedTest.reader)
+
+    def follow(self):
+        self.reader_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': TimelineFeedTest.author.username}
+        ))
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка переносит в ленту уже опубликованные посты автора."""
+        self.follow()
+        self.assertEqual(self.feed(), [TimelineFeedTest.old_post])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленту подписчика при публикации."""
+        self.follow()
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        new_post = Post.objects.get(text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineFeedTest.reader, post=new_post
+        ).exists())
+        self.assertEqual(self.feed(), [new_post, TimelineFeedTest.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        self.follow()
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': TimelineFeedTest.author.username}
+        ))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_existing_follows_are_backfilled(self):
+        """Команда раскладывает посты по лентам существующих подписок."""
+        other = User.objects.create_user(username='other')
+        # подписки, сделанные до включения FEED_TIMELINE
+        Follow.objects.create(
+            user=TimelineFeedTest.reader, author=TimelineFeedTest.author
+        )
+        Follow.objects.create(user=other, author=TimelineFeedTest.author)
+        self.assertEqual(self.feed(), [])
+        for _ in range(2):
+            out = StringIO()
+            call_command('backfill_timelines', '--batch-size', '1', stdout=out)
+            self.assertIn('Обработано подписок: 2', out.getvalue())
+        self.assertEqual(TimelineEntry.objects.count(), 2)
+        self.assertEqual(self.feed(), [TimelineFeedTest.old_post])
+
+
+@override_settings(FEED_TIMELINE=True, FEED_CELEBRITY_THRESHOLD=2)
+class HybridFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.author = User.objects.create_user(username='author')
+        cls.celebrity = User.objects.create_user(username='celebrity')
+        Follow.objects.create(user=cls.fan, author=cls.celebrity)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(HybridFeedTest.reader)
+        for author in (HybridFeedTest.author, HybridFeedTest.celebrity):
+            self.reader_client.get(reverse(
+                'posts:profile_follow', kwargs={'username': author.username}
+            ))
+
+    def publish(self, author, text):
+        client = Client()
+        client.force_login(author)
+        client.post(reverse('posts:post_create'), {'text': text})
+        return Post.objects.get(text=text)
+
+    def test_celebrity_posts_are_not_pushed(self):
+        """Посты автора с большой аудиторией не раскладываются по лентам."""
+        self.publish(HybridFeedTest.author, 'Обычный пост')
+        self.publish(HybridFeedTest.celebrity, 'Пост знаменитости')
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post__text', flat=True)),
+            ['Обычный пост'],
+        )
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента объединяет разложенные и вытянутые посты по дате."""
+        posts = [
+            self.publish(author, f'Пост {i}')
+            for i, author in enumerate(
+                [HybridFeedTest.author, HybridFeedTest.celebrity] * 7
+            )
+        ]
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 14)
+        self.assertEqual(list(page_obj), posts[::-1][:10])
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), {'page': 2}
+        )
+        self.assertEqual(list(response.context['page_obj']), posts[3::-1])
+
+    def test_celebrities_are_read_from_counters(self):
+        """Знаменитости определяются по счётчику, без COUNT подписок."""
+        follows.following_ids(HybridFeedTest.reader.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(feed.is_celebrity(HybridFeedTest.celebrity.pk))
+            self.assertEqual(
+                feed.celebrities_followed_by(HybridFeedTest.reader),
+                [HybridFeedTest.celebrity.pk],
+            )
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    @override_settings(FEED_CELEBRITY_EXIT_POSTS=1)
+    def test_former_celebrity_posts_are_pushed(self):
+        """Когда автор перестаёт быть знаменитостью, его посты в лентах."""
+        old_post = self.publish(HybridFeedTest.celebrity, 'Старый пост')
+        post = self.publish(HybridFeedTest.celebrity, 'Пост знаменитости')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        fan_client = Client()
+        fan_client.force_login(HybridFeedTest.fan)
+        with commit_callbacks():
+            fan_client.get(reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': HybridFeedTest.celebrity.username}
+            ))
+        self.assertFalse(feed.is_celebrity(HybridFeedTest.celebrity.pk))
+        # только последние посты, остальные раскладывает backfill_timelines
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(HybridFeedTest.reader.pk, post.pk)],
+        )
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+        call_command('backfill_timelines', stdout=StringIO())
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [post, old_post]
+        )
+
+    @override_settings(
+        FEED_CELEBRITY_THRESHOLD=10, FEED_CELEBRITY_EXIT_RATIO=0.8
+    )
+    def test_celebrity_status_has_hysteresis(self):
+        """Автор у порога не переключается при каждой подписке."""
+        author = HybridFeedTest.author
+        stats = UserStats.objects.filter(user=author)
+        steps = [(9, False), (10, True), (9, True), (8, True), (7, False),
+                 (9, False), (10, True)]
+        for followers_count, celebrity in steps:
+            with self.subTest(followers_count=followers_count):
+                stats.update(followers_count=followers_count)
+                feed.update_celebrity(author)
+                self.assertEqual(feed.is_celebrity(author.pk), celebrity)
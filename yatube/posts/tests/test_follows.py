@@ -0,0 +1,137 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import caching, counters, follows
+from ..models import Follow
+
+User = get_user_model()
+
+THREADS = 8
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def test_follow_is_one_query(self):
+        """Подписка и отписка выполняются одним запросом."""
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                Follow.objects.follow(self.user.pk, self.author.pk)
+            )
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                Follow.objects.follow(self.user.pk, self.author.pk)
+            )
+        self.assertEqual(Follow.objects.count(), 1)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                Follow.objects.unfollow(self.user.pk, self.author.pk)
+            )
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                Follow.objects.unfollow(self.user.pk, self.author.pk)
+            )
+
+    def test_duplicate_is_rejected_by_database(self):
+        """База не даёт подписаться дважды."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.user, author=self.author)
+
+
+class FollowSetCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        counters.recount_user(cls.author.pk)
+
+    def setUp(self):
+        cache.clear()
+        follows._local.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_follow_set_is_read_once(self):
+        """Подписки читаются из базы один раз."""
+        with self.assertNumQueries(1):
+            follows.following_ids(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follows.following_ids(self.user.pk), {self.author.pk}
+            )
+        follows._local.clear()
+        with self.assertNumQueries(0):
+            follows.following_ids(self.user.pk)
+
+    def test_change_in_other_process_is_seen(self):
+        """Подписка из другого процесса сбрасывает локальную копию."""
+        follows.following_ids(self.user.pk)
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user, author=other)
+        # another process only bumps the generation in the shared cache
+        caching.bump(f'following:{self.user.pk}')
+        self.assertEqual(
+            follows.following_ids(self.user.pk), {self.author.pk, other.pk}
+        )
+
+    @override_settings(FOLLOW_LOCAL_SIZE=1)
+    def test_least_recently_used_is_evicted(self):
+        """Локальный кэш хранит не больше FOLLOW_LOCAL_SIZE записей."""
+        follows.following_ids(self.user.pk)
+        follows.following_ids(self.author.pk)
+        self.assertEqual(list(follows._local), [self.author.pk])
+
+    def test_views_use_follow_set(self):
+        """Профайл не обращается к подпискам, пока они не изменились."""
+        follows.following_ids(self.user.pk)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in queries.captured_queries
+        ))
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(follows.following_ids(self.user.pk), frozenset())
+        response = self.client.get(url)
+        self.assertFalse(response.context['following'])
+
+
+class ParallelFollowTest(TransactionTestCase):
+    def test_parallel_follows_create_one_row(self):
+        """Параллельные подписки создают одну запись."""
+        user = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        barrier = threading.Barrier(THREADS)
+        results = []
+
+        def follow():
+            barrier.wait()
+            try:
+                results.append(Follow.objects.follow(user.pk, author.pk))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=follow) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [False] * (THREADS - 1) + [True])
+        self.assertEqual(Follow.objects.count(), 1)
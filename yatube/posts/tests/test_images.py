@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..models import ImageDerivative
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class OptimizeImagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        Image.new('RGB', (2000, 1000), 'red').save(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'big.png')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def optimize(self):
+        out = StringIO()
+        call_command(
+            'optimize_images', '--workers', '1', '--sizes', '800', '400',
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_variants_are_recorded(self):
+        """Команда сохраняет варианты картинки и записывает их в базу."""
+        output = self.optimize()
+        self.assertIn('Обработано: 1, пропущено: 0', output)
+        variants = {
+            item.variant: item for item in ImageDerivative.objects.all()
+        }
+        self.assertEqual(
+            set(variants), {'jpeg-800', 'jpeg-400', 'webp-800', 'webp-400'}
+        )
+        for name, item in variants.items():
+            with self.subTest(variant=name):
+                self.assertEqual(item.source, os.path.join('posts', 'big.png'))
+                size = int(name.split('-')[1])
+                self.assertEqual((item.width, item.height), (size, size // 2))
+                path = os.path.join(TEMP_MEDIA_ROOT, item.name)
+                self.assertEqual(os.path.getsize(path), item.size)
+                self.assertLess(item.size, item.source_size)
+
+    def test_second_run_skips_done_images(self):
+        """Повторный запуск пропускает уже обработанные картинки."""
+        self.optimize()
+        output = self.optimize()
+        self.assertIn('Обработано: 0, пропущено: 1', output)
+        self.assertEqual(ImageDerivative.objects.count(), 4)
+
+    def test_changed_image_is_processed_again(self):
+        """Изменённая картинка обрабатывается заново."""
+        self.optimize()
+        ImageDerivative.objects.filter(variant='webp-400').update(
+            source_mtime=0
+        )
+        output = self.optimize()
+        self.assertIn('Обработано: 1, пропущено: 0', output)
+        self.assertIn('webp-400', output)
+        self.assertNotIn('jpeg-800', output)
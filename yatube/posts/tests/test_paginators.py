@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post
+from ..paginators import KeysetPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(25)
+        )
+        # половина постов с одинаковой датой, порядок решает pk
+        same_date = timezone.now()
+        Post.objects.filter(
+            pk__in=Post.objects.values_list('pk', flat=True)[:12]
+        ).update(pub_date=same_date)
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Post.objects.all(), 10)
+        cache.clear()
+
+    def test_cursor_roundtrip(self):
+        """Курсор кодируется и раскодируется без потерь."""
+        post = self.expected[0]
+        token = encode_cursor(post.pub_date, post.pk)
+        self.assertEqual(decode_cursor(token), (post.pub_date, post.pk))
+
+    def test_walk_forward_and_back(self):
+        """Проход вперёд и назад по курсорам даёт все посты по порядку."""
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(
+                after=pages[-1].next_cursor
+            ))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        walked = [post for page in pages for post in page]
+        self.assertEqual(walked, self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = self.paginator.get_page(
+            before=pages[-1].previous_cursor
+        )
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertTrue(previous.has_next())
+        first = self.paginator.get_page(before=previous.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_page_cost_does_not_depend_on_depth(self):
+        """Страница выбирается одним запросом без COUNT и OFFSET."""
+        page = self.paginator.get_page()
+        page = self.paginator.get_page(after=page.next_cursor)
+        with self.assertNumQueries(1) as context:
+            self.paginator.get_page(after=page.next_cursor)
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('COUNT', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        page = self.paginator.get_page(after='not-a-cursor')
+        self.assertEqual(list(page), self.expected[:10])
+
+    @override_settings(PAGINATION_MODE='keyset')
+    def test_views_render_keyset_pages(self):
+        """Страницы со списками работают с курсорами."""
+        client = Client()
+        client.force_login(KeysetPaginatorTest.user)
+        urls = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': KeysetPaginatorTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': KeysetPaginatorTest.user.username}
+            ),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                page_obj = response.context['page_obj']
+                self.assertEqual(list(page_obj), self.expected[:10])
+                self.assertContains(
+                    response, f'?after={page_obj.next_cursor}'
+                )
+                response = client.get(url, {'after': page_obj.next_cursor})
+                self.assertEqual(
+                    list(response.context['page_obj']), self.expected[10:20]
+                )
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import counters
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ListQueriesTest(TestCase):
+    """Число запросов страниц со списками не зависит от числа постов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ListQueriesTest.reader)
+        cache.clear()
+
+    def create_posts(self, amount):
+        Post.objects.bulk_create(
+            Post(
+                author=ListQueriesTest.user,
+                group=ListQueriesTest.group,
+                text=f'Тестовый текст {i}',
+            )
+            for i in range(amount)
+        )
+        counters.recount_user(ListQueriesTest.user.pk)
+
+    def assert_queries(self, client, url, expected):
+        for amount in (1, 12):
+            with self.subTest(url=url, posts=amount):
+                Post.objects.all().delete()
+                self.create_posts(amount)
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    client.get(url)
+
+    def test_index(self):
+        """Главная страница: COUNT и выборка страницы."""
+        self.assert_queries(self.guest_client, reverse('posts:index'), 2)
+
+    def test_group_list(self):
+        """Страница группы: группа, COUNT и выборка страницы."""
+        url = reverse(
+            'posts:group_list', kwargs={'slug': ListQueriesTest.group.slug}
+        )
+        self.assert_queries(self.guest_client, url, 3)
+
+    def test_profile(self):
+        """Профайл: автор, счётчики и выборка страницы без COUNT."""
+        url = reverse(
+            'posts:profile',
+            kwargs={'username': ListQueriesTest.user.username}
+        )
+        self.assert_queries(self.guest_client, url, 3)
+
+    def test_follow_index(self):
+        """Лента: сессия, пользователь, подписки, EXISTS, COUNT, страница.
+
+        Кэш очищается перед запросом, поэтому подписки читаются из базы.
+        """
+        self.assert_queries(
+            self.reader_client, reverse('posts:follow_index'), 6
+        )
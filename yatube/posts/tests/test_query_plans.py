@@ -0,0 +1,85 @@
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feed
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+class QueryPlanTest(TestCase):
+    """Every query of the post pages reads an index in the needed order.
+
+    Not covered: the search results are sorted by a computed rank, and the
+    pull feed merges the posts of many authors, so both sort by design.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plan_of(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            plan = self.plan_of(sql)
+            with self.subTest(url=url, sql=sql, plan=plan):
+                for step in plan:
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith('SCAN'):
+                        self.assertIn('INDEX', step)
+
+    def test_post_pages(self):
+        """Страницы постов читают индексы без сортировки в TEMP B-TREE."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+        ]
+        for mode in ('offset', 'keyset'):
+            with override_settings(PAGINATION_MODE=mode):
+                for url in urls:
+                    self.assertIndexedQueries(url)
+
+    @override_settings(FEED_TIMELINE=True)
+    def test_timeline_feed(self):
+        """Лента из таблицы timeline читает её индекс по порядку."""
+        feed.backfill(self.reader, self.author)
+        self.assertIndexedQueries(reverse('posts:follow_index'))
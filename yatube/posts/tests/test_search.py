@@ -0,0 +1,164 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, SearchEntry
+
+User = get_user_model()
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def terms_of(self, post):
+        return dict(
+            SearchEntry.objects.filter(post=post).values_list('term', 'count')
+        )
+
+    def test_tokenize(self):
+        """Слова приводятся к нижнему регистру, ё заменяется на е."""
+        self.assertEqual(
+            search.tokenize('Ёжик, ёжик! Туман-2'),
+            ['ежик', 'ежик', 'туман', '2'],
+        )
+
+    def test_index_follows_post(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        post = Post.objects.create(author=self.user, text='Ёжик в тумане')
+        search.flush()
+        self.assertEqual(
+            self.terms_of(post), {'ежик': 1, 'в': 1, 'тумане': 1}
+        )
+        post.text = 'Ёжик и ёжик'
+        post.save()
+        search.flush()
+        self.assertEqual(self.terms_of(post), {'ежик': 2, 'и': 1})
+        post_id = post.pk
+        post.delete()
+        self.assertFalse(SearchEntry.objects.filter(post_id=post_id).exists())
+
+    def test_unchanged_text_is_not_reindexed(self):
+        """Сохранение без правки текста не трогает индекс."""
+        post = Post.objects.create(author=self.user, text='Ёжик в тумане')
+        search.flush()
+        SearchEntry.objects.all().delete()
+        post = Post.objects.get(pk=post.pk)
+        post.save()
+        search.flush()
+        self.assertFalse(SearchEntry.objects.exists())
+
+    def test_posts_are_indexed_in_one_batch(self):
+        """Посты одной транзакции индексируются одним пакетом."""
+        posts = [
+            Post.objects.create(author=self.user, text=f'пост {number}')
+            for number in range(20)
+        ]
+        self.assertFalse(SearchEntry.objects.exists())
+        with self.assertNumQueries(5):
+            search.flush()
+        self.assertEqual(SearchEntry.objects.count(), 40)
+        with self.assertNumQueries(0):
+            search.flush()
+        for post in posts:
+            post.text = 'правка'
+            post.save()
+        search.flush()
+        self.assertEqual(
+            set(SearchEntry.objects.values_list('term', flat=True)),
+            {'правка'},
+        )
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс частями."""
+        for number in range(5):
+            Post.objects.create(author=self.user, text=f'пост {number}')
+        search.flush()
+        SearchEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', '--chunk-size', '2', stdout=out)
+        self.assertIn('Проиндексировано постов: 5', out.getvalue())
+        self.assertEqual(SearchEntry.objects.count(), 10)
+
+    def test_rare_words_rank_higher(self):
+        """Редкое слово весит больше частого."""
+        for _ in range(5):
+            Post.objects.create(author=self.user, text='кот')
+        rare = Post.objects.create(author=self.user, text='кот и выдра')
+        common = Post.objects.create(author=self.user, text='кот кот кот')
+        search.flush()
+        results = list(search.search('кот выдра'))
+        self.assertEqual(results[0], rare)
+        self.assertEqual(results[1], common)
+        self.assertEqual(len(results), 7)
+        self.assertEqual(list(search.search('')), [])
+        self.assertEqual(list(search.search('бобр')), [])
+
+    def test_filters(self):
+        """Результаты фильтруются по группе и автору."""
+        group = Group.objects.create(title='Группа', slug='group')
+        other = User.objects.create_user(username='other')
+        in_group = Post.objects.create(
+            author=self.user, group=group, text='слово'
+        )
+        by_other = Post.objects.create(author=other, text='слово')
+        Post.objects.create(author=self.user, text='слово')
+        search.flush()
+        self.assertEqual(list(search.search('слово', group=group)), [in_group])
+        self.assertEqual(
+            list(search.search('слово', author=other)), [by_other]
+        )
+
+
+@override_settings(PAGE_SIZE=2)
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(3):
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'выдра номер {number}'
+            )
+        Post.objects.create(author=cls.user, text='бобр')
+        search.flush()
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты по страницам."""
+        url = reverse('posts:search')
+        response = Client().get(url, {'q': 'Выдра', 'group': 'group'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertContains(response, '?q=%D0%92%D1%8B%D0%B4%D1%80%D0%B0')
+        self.assertContains(response, 'page=2')
+        self.assertNotContains(response, 'бобр')
+
+    def test_unknown_filters(self):
+        """Несуществующие группа и автор дают 404."""
+        url = reverse('posts:search')
+        for params in ({'group': 'missing'}, {'author': 'missing'}):
+            with self.subTest(params=params):
+                response = Client().get(url, {'q': 'выдра', **params})
+                self.assertEqual(response.status_code, 404)
+
+
+class SearchIndexCommitTest(TransactionTestCase):
+    def test_index_is_written_on_commit(self):
+        """Индекс пишется после коммита транзакции, а не при save()."""
+        user = User.objects.create_user(username='auth')
+        with transaction.atomic():
+            Post.objects.create(author=user, text='первый')
+            Post.objects.create(author=user, text='второй')
+            self.assertFalse(SearchEntry.objects.exists())
+        self.assertEqual(
+            set(SearchEntry.objects.values_list('term', flat=True)),
+            {'первый', 'второй'},
+        )
@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def create_post(author):
+    return Post.objects.create(
+        author=author,
+        text='Пост с картинкой',
+        image=SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif'
+        ),
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = create_post(self.user)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_page_does_not_render_thumbnails(self):
+        """Страница с новой картинкой выводит заглушку, а не ресайзит."""
+        response = Client().get(self.url)
+        self.assertContains(response, 'style="height: 339px"')
+        for geometry in thumbnails.GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                self.assertIsNone(
+                    thumbnails.lookup(self.post.image, geometry)
+                )
+
+    def test_generated_thumbnails_are_shown(self):
+        """После фоновой обработки страница выводит миниатюру."""
+        thumbnails.generate(self.post.pk)
+        for geometry in thumbnails.GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                self.assertIsNotNone(
+                    thumbnails.lookup(self.post.image, geometry)
+                )
+        response = Client().get(self.url)
+        image = thumbnails.lookup(self.post.image, '960x339')
+        self.assertContains(response, f'src="{image.url}"')
+
+    def test_page_thumbnails_are_looked_up_at_once(self):
+        """Миниатюры страницы ищутся одним запросом к кэшу."""
+        other = create_post(self.user)
+        no_image = Post.objects.create(author=self.user, text='Без картинки')
+        thumbnails.generate(self.post.pk)
+        posts = [self.post, other, no_image]
+        cache.clear()
+        with self.assertNumQueries(1):
+            found = thumbnails.lookup_many(posts, thumbnails.LIST_GEOMETRY)
+        with self.assertNumQueries(0):
+            again = thumbnails.lookup_many(posts, thumbnails.LIST_GEOMETRY)
+        for post in posts:
+            with self.subTest(post=post.pk):
+                single = thumbnails.lookup(
+                    post.image, thumbnails.LIST_GEOMETRY
+                )
+                self.assertEqual(
+                    getattr(found[post.pk], 'name', None),
+                    getattr(single, 'name', None),
+                )
+                self.assertEqual(
+                    getattr(again[post.pk], 'name', None),
+                    getattr(single, 'name', None),
+                )
+        self.assertIsNotNone(found[self.post.pk])
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, f'src="{found[self.post.pk].url}"')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailWorkersTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        # no worker may outlive the test and its database
+        thumbnails.wait()
+
+    def test_saved_image_is_rendered_in_background(self):
+        """Сохранённая картинка обрабатывается фоновым потоком."""
+        post = create_post(User.objects.create_user(username='auth'))
+        thumbnails.wait(timeout=10)
+        rendered = [
+            geometry for geometry in thumbnails.GEOMETRIES
+            if thumbnails.lookup(post.image, geometry) is not None
+        ]
+        self.assertEqual(rendered, list(thumbnails.GEOMETRIES))
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_workers_can_be_turned_off(self):
+        """Без фоновых потоков миниатюры не ставятся в очередь."""
+        post = create_post(User.objects.create_user(username='auth'))
+        self.assertEqual(thumbnails._pending, {})
+        self.assertIsNone(thumbnails.lookup(post.image, '960x339'))
@@ -0,0 +1,153 @@
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http.multipartparser import MultiPartParser
+from django.test import Client, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+from PIL import Image, ImageFile
+
+from ..models import Post
+from ..uploads import ImageUploadHandler
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+MAX_SIZE = 2 ** 20
+
+
+def image_file(size=(10, 10), image_format='PNG', name='image.png'):
+    content = io.BytesIO()
+    Image.new('RGB', size, 'blue').save(content, format=image_format)
+    return SimpleUploadedFile(name, content.getvalue())
+
+
+def noise_file(size):
+    return SimpleUploadedFile('noise.png', os.urandom(size))
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def parse(data, max_size=MAX_SIZE):
+    body = encode_multipart(BOUNDARY, data)
+    stream = CountingStream(body)
+    handler = ImageUploadHandler(max_size=max_size)
+    parser = MultiPartParser(
+        {'CONTENT_TYPE': MULTIPART_CONTENT, 'CONTENT_LENGTH': len(body)},
+        stream, [handler],
+    )
+    tracemalloc.start()
+    try:
+        post, files = parser.parse()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return post, files, handler, stream, peak
+
+
+class ImageUploadHandlerTest(TestCase):
+    def test_memory_does_not_grow_with_upload(self):
+        """Память на загрузку не зависит от размера файла."""
+        peaks = []
+        for size in (MAX_SIZE // 8, MAX_SIZE - 1024):
+            post, files, handler, stream, peak = parse(
+                {'text': 'Текст', 'image': noise_file(size)}
+            )
+            self.assertEqual(files['image'].size, size)
+            self.assertTrue(hasattr(files['image'], 'temporary_file_path'))
+            files['image'].close()
+            peaks.append(peak)
+        self.assertLess(max(peaks), 4 * ImageUploadHandler.chunk_size)
+        self.assertLess(peaks[1] - peaks[0], ImageUploadHandler.chunk_size)
+
+    def test_oversize_upload_is_cut_off(self):
+        """Большой файл обрывает чтение тела запроса."""
+        post, files, handler, stream, peak = parse(
+            {'text': 'Текст', 'image': noise_file(8 * MAX_SIZE)}
+        )
+        self.assertEqual(post['text'], 'Текст')
+        self.assertNotIn('image', files)
+        self.assertIsNotNone(handler.error)
+        self.assertLess(stream.bytes_read, 2 * MAX_SIZE)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_oversize_body_is_rejected_before_the_file(self):
+        """Файл не читается, если тело длиннее обоих лимитов."""
+        post, files, handler, stream, peak = parse(
+            {'text': 'Текст', 'image': noise_file(8 * MAX_SIZE)}
+        )
+        self.assertIsNotNone(handler.error)
+        self.assertLess(stream.bytes_read, 2 * ImageUploadHandler.chunk_size)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=MAX_SIZE,
+    THUMBNAIL_WORKERS=0,
+)
+class PostImageUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:post_create')
+
+    def create(self, image):
+        return self.client.post(
+            self.url, {'text': 'Пост с картинкой', 'image': image}
+        )
+
+    def test_image_is_saved(self):
+        """Картинка проверяется по заголовку, без декодирования."""
+        image = image_file()
+        with mock.patch.object(
+            ImageFile.ImageFile, 'load', side_effect=AssertionError('decoded')
+        ):
+            response = self.create(image)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Post.objects.get().image.name.startswith('posts/'))
+
+    def test_invalid_images_are_rejected(self):
+        """Большие, повреждённые и неподходящие файлы отклоняются."""
+        cases = {
+            'size': noise_file(2 * MAX_SIZE),
+            'dimensions': image_file(size=(settings.POST_IMAGE_MAX_SIDE + 1,
+                                           1)),
+            'format': image_file(image_format='BMP', name='image.bmp'),
+            'garbage': noise_file(1024),
+        }
+        for case, image in cases.items():
+            with self.subTest(case=case):
+                response = self.create(image)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+                self.assertFalse(Post.objects.exists())
+
+    @override_settings(CSRF_FAILURE_VIEW='django.views.csrf.csrf_failure')
+    def test_csrf_is_still_checked(self):
+        """Проверка CSRF работает и с обработчиком загрузок."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(self.url, {'text': 'Пост без токена'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.exists())
@@ -1,4 +1,3 @@
-import copy
 import shutil
 import tempfile
 from datetime import datetime
@@ -8,10 +7,12 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import caching
 from ..models import Follow, Group, Post
+from .utils import commit_callbacks
 
 User = get_user_model()
 
@@ -69,6 +70,7 @@ class PostsViewsTest(TestCase):
                 self.assertTemplateUsed(response, template)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class ContextPaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -241,14 +243,55 @@ class ContextPaginatorViewsTest(TestCase):
         )
         self.assertNotIn(new_post, response.context['page_obj'])
 
-    def test_cache_on_delete(self):
+    def test_index_is_cached(self):
+        """Главная отдаётся из кеша, пока поколение постов не сменилось."""
         self.authorized_client.get(reverse('posts:index'))
-        post_to_delete = Post.objects.first()
-        post_to_find = copy.deepcopy(post_to_delete)
+        # update() не отправляет сигналов и не сбрасывает кеш
+        Post.objects.filter(pk=self.posts[-1].pk).update(text='Новый текст')
 
-        post_to_delete.delete()
         response_1 = self.authorized_client.get(reverse('posts:index'))
-        self.assertContains(response_1, post_to_find.text)
+        self.assertNotContains(response_1, 'Новый текст')
+        # сигнал сбросил бы и ленту, и карточку поста
+        caching.bump('all', f'post:{self.posts[-1].pk}')
+        response_2 = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response_2, 'Новый текст')
+
+    def test_cache_on_delete(self):
+        """Удалённый пост сразу пропадает с закешированных страниц."""
+        post_to_delete = Post.objects.first()
+        post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': post_to_delete.pk}
+        )
+        for reverse_name in self.paginator_link_list:
+            self.authorized_client.get(reverse_name)
+
+        with commit_callbacks():
+            post_to_delete.delete()
+        for reverse_name in self.paginator_link_list:
+            with self.subTest(reverse_name=reverse_name):
+                response = self.authorized_client.get(reverse_name)
+                self.assertNotContains(response, f'href="{post_url}"')
+
+    def test_cache_on_group_change(self):
+        """Пост, перенесённый в другую группу, пропадает со старой."""
+        post = self.posts[-1]
+        post_url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        old_group_url = self.paginator_link_list[1]
+        self.assertContains(
+            self.authorized_client.get(old_group_url), f'href="{post_url}"'
+        )
+
+        with commit_callbacks():
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                {
+                    'text': post.text,
+                    'group': ContextPaginatorViewsTest.group2.pk,
+                },
+            )
+        self.assertNotContains(
+            self.authorized_client.get(old_group_url), f'href="{post_url}"'
+        )
 
     def test_subscription(self):
         new_user = User.objects.create_user(username='IAmNew')
@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def commit_callbacks():
+    """Run the on_commit callbacks registered inside the block.
+
+    TestCase never commits, so they would not run at all; the same as
+    captureOnCommitCallbacks(execute=True) of Django 3.2.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
@@ -0,0 +1,166 @@
+import logging
+import threading
+from concurrent import futures
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedKVStore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# every geometry the templates render, with the options they pass
+GEOMETRIES = {
+    '960x139': {'crop': 'center', 'upscale': True},
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+# the geometry of the post cards on the list pages
+LIST_GEOMETRY = '960x139'
+
+_executor = None
+# post id -> future of the thumbnails being rendered
+_pending = {}
+_lock = threading.Lock()
+
+
+class LookupBackend(ThumbnailBackend):
+    """Finds an existing thumbnail and never renders a missing one."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        name = self.thumbnail_name(file_, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def thumbnail_name(self, file_, geometry_string, options):
+        options = dict(options)
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+
+        return self._get_thumbnail_filename(source, geometry_string, options)
+
+
+def lookup(image, geometry):
+    if not image:
+        return None
+    options = GEOMETRIES[geometry]
+    return LookupBackend().get_thumbnail(image, geometry, **options)
+
+
+def lookup_many(posts, geometry):
+    """Thumbnails of several posts by pk, in one round trip to the cache.
+
+    The same as lookup() for every post, but the kvstore entries come from
+    one get_many, and the ones missing from the cache from one query.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedKVStore):
+        return {post.pk: lookup(post.image, geometry) for post in posts}
+
+    backend = LookupBackend()
+    keys = {}
+    for post in posts:
+        if post.image:
+            name = backend.thumbnail_name(
+                post.image, geometry, GEOMETRIES[geometry]
+            )
+            keys[post.pk] = add_prefix(ImageFile(name, default.storage).key)
+    values = kvstore.cache.get_many(keys.values()) if keys else {}
+    missing = set(keys.values()) - set(values)
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        fresh = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fresh, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fresh)
+
+    found = {post.pk: None for post in posts}
+    for pk, key in keys.items():
+        if values[key] != EMPTY_VALUE and values[key]:
+            found[pk] = deserialize_image_file(values[key])
+    return found
+
+
+def prefetch(posts, geometry=LIST_GEOMETRY):
+    """Look up the thumbnails of a page of posts for cached_thumbnail."""
+    found = lookup_many(posts, geometry)
+    for post in posts:
+        post.__dict__.setdefault('_thumbnails', {})[geometry] = found[post.pk]
+
+
+def generate(post_id):
+    """Render every known geometry of a post image and refresh its pages."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None or not post.image:
+        return
+    for geometry, options in GEOMETRIES.items():
+        get_thumbnail(post.image, geometry, **options)
+    scopes = ['all', f'author:{post.author.username}', f'post:{post.pk}']
+    if post.group:
+        scopes.append(f'group:{post.group.slug}')
+    caching.bump(*scopes)
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Thumbnails of post %s failed', post_id)
+    finally:
+        with _lock:
+            _pending.pop(post_id, None)
+        connection.close()
+
+
+def submit(post_id):
+    """Queue the thumbnails of a post for the background workers.
+
+    With THUMBNAIL_WORKERS = 0 nothing is queued, and only generate()
+    renders thumbnails.
+    """
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        return
+    with _lock:
+        if post_id in _pending:
+            return
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        _pending[post_id] = _executor.submit(_run, post_id)
+
+
+def wait(timeout=None):
+    """Block until the queued thumbnails are rendered."""
+    with _lock:
+        pending = list(_pending.values())
+    futures.wait(pending, timeout)
+
+
+def schedule(post_id):
+    """Render thumbnails in the background once the post is committed."""
+    transaction.on_commit(lambda: submit(post_id))
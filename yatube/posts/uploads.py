@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler, StopUpload,
+                                             StopFutureHandlers)
+from django.template.defaultfilters import filesizeformat
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Streams one file field to a temporary file in small chunks.
+
+    At most one chunk is held in memory. An upload over
+    POST_IMAGE_MAX_SIZE stops the parsing right away, so the rest of the
+    body is never read; the reason is kept in ``error`` for the form.
+    Other fields are left to the default handlers.
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def __init__(self, request=None, field_name='image', max_size=None):
+        super().__init__(request)
+        self.target_field = field_name
+        self.max_size = max_size or settings.POST_IMAGE_MAX_SIZE
+        self.body_length = None
+        self.active = False
+        self.error = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.body_length = content_length
+
+    def reject(self):
+        self.error = f'Картинка больше {filesizeformat(self.max_size)}'
+        raise StopUpload(connection_reset=True)
+
+    def new_file(self, field_name, *args, **kwargs):
+        self.active = field_name == self.target_field
+        if not self.active:
+            return
+        super().new_file(field_name, *args, **kwargs)
+        # the non-file fields are capped by DATA_UPLOAD_MAX_MEMORY_SIZE,
+        # so a body longer than both limits can only hold an oversize file
+        form_limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if (form_limit is not None and self.body_length
+                and self.body_length > self.max_size + form_limit):
+            self.reject()
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra
+        )
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if start + len(raw_data) > self.max_size:
+            self.reject()
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+
+def validate_image_header(file):
+    """Check the format and size of an image read by forms.ImageField.
+
+    The field opens the upload with Image.open(), which reads the header
+    and leaves the pixels undecoded, so this costs the same for any size.
+    """
+    image = getattr(file, 'image', None)
+    if image is None:
+        return
+    if image.format not in settings.POST_IMAGE_FORMATS:
+        raise ValidationError(
+            'Поддерживаются форматы: %(formats)s',
+            code='image_format',
+            params={'formats': ', '.join(settings.POST_IMAGE_FORMATS)},
+        )
+    if max(image.size) > settings.POST_IMAGE_MAX_SIDE:
+        raise ValidationError(
+            'Картинка больше %(side)s пикселей по стороне',
+            code='image_too_large',
+            params={'side': settings.POST_IMAGE_MAX_SIDE},
+        )
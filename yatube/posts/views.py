@@ -2,30 +2,50 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.generic.edit import CreateView, UpdateView
 
+from core.db import read_from_replica
+
+from . import actions, counters, feed, follows, search
+from .caching import cache_posts_page, conditional_posts_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Group, Post
+from .paginators import KeysetPaginator
+from .uploads import ImageUploadHandler
 
 User = get_user_model()
 
 
-def set_pagination(request, obj_list, amount=settings.PAGE_SIZE):
-    paginator = Paginator(obj_list, amount)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def set_pagination(request, obj_list, amount=settings.PAGE_SIZE, count=None):
+    if settings.PAGINATION_MODE == 'keyset':
+        paginator = KeysetPaginator(obj_list, amount)
+        page_obj = paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    else:
+        paginator = Paginator(obj_list, amount)
+        if count is not None:
+            # a maintained counter saves the COUNT(*) query
+            paginator.count = count
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20)
+@read_from_replica
+@cache_posts_page('all')
 def index(request):
     template = 'posts/index.html'
 
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_listing()
     page_obj = set_pagination(request, post_list)
 
     context = {
@@ -34,11 +54,13 @@ def index(request):
     return render(request, template, context)
 
 
+@read_from_replica
+@cache_posts_page('group:{slug}')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
 
-    post_list = group.posts.all()
+    post_list = group.posts.for_listing()
     page_obj = set_pagination(request, post_list)
 
     context = {
@@ -48,58 +70,143 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def search_posts(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+
+    post_list = search.search(query, group=group, author=author).for_listing()
+    # ranked results are numbered pages in either pagination mode
+    page_obj = Paginator(post_list, settings.PAGE_SIZE).get_page(
+        request.GET.get('page')
+    )
+    params = request.GET.copy()
+    params.pop('page', None)
+
+    context = {
+        'page_obj': page_obj,
+        'page_query': params.urlencode() + '&' if params else '',
+        'query': query,
+        'group': group,
+        'author': author,
+        'groups': Group.objects.all(),
+    }
+    return render(request, template, context)
+
+
+@read_from_replica
+@cache_posts_page('author:{username}')
 def profile(request, username):
     template = 'posts/profile.html'
     author = User.objects.get(username=username)
 
-    post_list = author.posts.all()
-    page_obj = set_pagination(request, post_list)
+    author_stats = counters.stats_for(author)
 
-    is_following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
+    post_list = author.posts.for_listing()
+    page_obj = set_pagination(
+        request, post_list, count=author_stats.posts_count
+    )
+
+    is_following = follows.is_following(request.user, author)
 
     context = {
         'page_obj': page_obj,
         'author': author,
+        'author_stats': author_stats,
         'following': is_following,
     }
     return render(request, template, context)
 
 
+def set_comments_page(request, post):
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PAGE_SIZE,
+        key_field='created',
+    )
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+def post_detail_scopes(post_id):
+    # the page shows the author's counters, which bump the author scope;
+    # the author of a post never changes, so it is looked up only once
+    key = f'posts:author_of:{post_id}'
+    author = cache.get(key)
+    if author is None:
+        author = Post.objects.filter(pk=post_id).values_list(
+            'author__username', flat=True
+        ).first()
+        if author is None:
+            return None
+        cache.set(key, author, settings.POSTS_GENERATION_TIMEOUT)
+    return [f'post:{post_id}', f'author:{author}']
+
+
+@read_from_replica
+@conditional_posts_page(post_detail_scopes)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    specific_post = get_object_or_404(Post, pk=post_id)
+    specific_post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
 
-    page_obj = specific_post.author.posts.all()
+    author_stats = counters.stats_for(specific_post.author)
 
-    comments_list = specific_post.comments.all()
+    comments_list = set_comments_page(request, specific_post)
     form = CommentForm()
 
     context = {
         'post': specific_post,
-        'page_obj': page_obj,
+        'author_stats': author_stats,
         'comments': comments_list,
         'form': form,
     }
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = set_comments_page(request, post)
+
+    data = {
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'author_url': reverse(
+                    'posts:profile', args=[comment.author.username]
+                ),
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': comments.next_cursor,
+    }
+    return JsonResponse(data)
+
+
 @login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = get_object_or_404(Post, pk=post_id)
-        comment.save()
+        comment.post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+        actions.add_comment(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
     template = 'posts/follow.html'
 
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = feed.feed_for(request.user)
     no_follow = post_list.exists()
 
     page_obj = set_pagination(request, post_list)
@@ -114,21 +221,37 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
-
+    actions.follow(request.user, author)
     return redirect('posts:profile', username=author)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
-
+    actions.unfollow(request.user, author)
     return redirect('posts:index')
 
 
-class PostCreate(LoginRequiredMixin, CreateView):
+class ImageUploadMixin:
+    """Parses the post form with ImageUploadHandler in front.
+
+    Upload handlers can only be changed before the body is read, and the
+    CSRF check reads it, so the check runs here, after the handler is in.
+    """
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        self.upload_handler = ImageUploadHandler(request)
+        request.upload_handlers.insert(0, self.upload_handler)
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['upload_error'] = self.upload_handler.error
+        return kwargs
+
+
+class PostCreate(ImageUploadMixin, LoginRequiredMixin, CreateView):
     form_class = PostForm
     template_name = 'posts/create_post.html'
 
@@ -140,7 +263,7 @@ class PostCreate(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance = form.save(commit=False)
         form.instance.author = self.request.user
-        form.instance.save()
+        actions.publish_post(form.instance)
 
         success_url = reverse(
             'posts:profile',
@@ -150,7 +273,8 @@ class PostCreate(LoginRequiredMixin, CreateView):
         return redirect(success_url)
 
 
-class PostEdit(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class PostEdit(ImageUploadMixin, LoginRequiredMixin, UserPassesTestMixin,
+               UpdateView):
     form_class = PostForm
     template_name = 'posts/create_post.html'
 
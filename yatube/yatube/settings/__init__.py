@@ -0,0 +1,21 @@
+"""Settings of the profile named by the DJANGO_ENV environment variable.
+
+    DJANGO_ENV=dev   # the default: DEBUG, per-process cache
+    DJANGO_ENV=prod  # see yatube/settings/prod.py
+
+DJANGO_SETTINGS_MODULE stays yatube.settings for both of them.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+
+if DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'DJANGO_ENV must be dev or prod, not {DJANGO_ENV!r}'
+    )
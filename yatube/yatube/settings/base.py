@@ -0,0 +1,276 @@
+"""
+Settings shared by the dev and prod profiles of the yatube project.
+
+yatube.settings picks the profile by the DJANGO_ENV environment variable;
+this module is never used on its own.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+import tempfile
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ['SECRET_KEY']
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+
+ALLOWED_HOSTS = [
+    'malyshevadv.pythonanywhere.com',
+    'www.malyshevadv.pythonanywhere.com',
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.PrimaryPinMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+# compile every template at worker boot, see core.warmup
+TEMPLATES_WARM_UP = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# sqlite (the default) or postgres, e.g.
+# DB_ENGINE=postgres DB_NAME=yatube DB_USER=yatube DB_HOST=127.0.0.1
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+# every worker thread keeps its connection open for this many seconds
+# instead of connecting on every request
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DATABASE_ENGINES = {
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'yatube'),
+        'USER': os.environ.get('DB_USER', 'yatube'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        # DB_POOLER=1 when DB_HOST is a PgBouncer in transaction pooling
+        # mode, which cannot keep server-side cursors between queries
+        'DISABLE_SERVER_SIDE_CURSORS': bool(os.environ.get('DB_POOLER')),
+    },
+}
+DATABASES = {
+    'default': DATABASE_ENGINES[DB_ENGINE],
+}
+# a read-only copy of default for the list and post pages, e.g.
+# DB_REPLICA_HOST=10.0.0.2, or DB_REPLICA_NAME for a copy of the SQLite file
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get(
+            'DB_REPLICA_HOST', DATABASES['default'].get('HOST', '')
+        ),
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+# after a write the user reads from default until the replica caught up
+REPLICA_PIN_SECONDS = 5
+
+# applied to every new SQLite connection by core.db
+SQLITE_PRAGMAS = {
+    # readers no longer block the writer, and the writer no readers
+    'journal_mode': 'wal',
+    # with WAL only checkpoints are synced, a crash may lose the last
+    # commits but never corrupts the database
+    'synchronous': 'normal',
+    # milliseconds a writer waits for the lock before "database is locked"
+    'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 5000)),
+    # 64 MiB of page cache, temporary tables in memory
+    'cache_size': -64 * 2 ** 10,
+    'temp_store': 'memory',
+    'mmap_size': 256 * 2 ** 20,
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+# 'offset' numbers the pages, 'keyset' pages by ?after=/?before= cursors
+PAGINATION_MODE = 'offset'
+# push new posts into per-follower timelines instead of joining on read;
+# run `manage.py backfill_timelines` before turning it on
+FEED_TIMELINE = False
+# authors with this many followers are pulled on read instead of pushed,
+# and are pushed again only below FEED_CELEBRITY_EXIT_RATIO of it, so an
+# author at the threshold does not switch on every follow
+FEED_CELEBRITY_THRESHOLD = None
+FEED_CELEBRITY_EXIT_RATIO = 0.9
+# a former celebrity gets this many latest posts pushed after the unfollow,
+# the older ones by `manage.py backfill_timelines`
+FEED_CELEBRITY_EXIT_POSTS = 20
+
+# follow sets of users: in the shared cache, and in an LRU per process
+FOLLOW_CACHE_TIMEOUT = 60 * 60
+FOLLOW_LOCAL_TIMEOUT = 60
+FOLLOW_LOCAL_SIZE = 10000
+# feeds of users following more authors join Follow instead of IN (...)
+FOLLOW_IN_LIMIT = 500
+
+# background threads rendering thumbnails of uploaded images, 0 turns
+# them off (the tests do, as the threads cannot see their transaction)
+THUMBNAIL_WORKERS = 2
+# uploads over this size are cut off before the rest of the body is read
+POST_IMAGE_MAX_SIZE = 5 * 2 ** 20
+# checked from the image header, the pixels are never decoded
+POST_IMAGE_MAX_SIDE = 6000
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# pages are invalidated by posts.signals, so they never expire
+POSTS_PAGE_CACHE_TIMEOUT = None
+# how long an expired page may still be served while it is regenerated;
+# without POSTS_PAGE_CACHE_TIMEOUT, how long an unread page is kept
+POSTS_PAGE_STALE_TIMEOUT = 60 * 60
+# generations of groups, authors and posts; an expired one starts again
+# from the clock, which only costs the pages of the scope a render
+POSTS_GENERATION_TIMEOUT = 7 * 24 * 60 * 60
+# how long other requests wait for the one regenerating a page
+POSTS_PAGE_LOCK_TIMEOUT = 10
+# post cards are invalidated with their post, the timeout only bounds
+# how long a renamed author keeps the old name on them
+POST_CARD_CACHE_TIMEOUT = 24 * 60 * 60
+
+# locmem is private to every worker process; file, db (a table in the
+# default database, create it with `manage.py createcachetable`) and
+# redis (needs django-redis) are shared between the workers
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'yatube')
+        ),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'yatube_cache'),
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', 'redis://127.0.0.1:6379/1'
+        ),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
@@ -0,0 +1,4 @@
+"""Settings of the development server and of the test runs."""
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
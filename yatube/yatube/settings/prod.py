@@ -0,0 +1,56 @@
+"""Settings of the production workers.
+
+    DJANGO_ENV=prod gunicorn yatube.wsgi
+
+DEBUG is off, so connection.queries no longer keeps every SQL query of a
+long-lived worker. Connections, compiled templates and the cache outlive
+the request, and static files are served by the web server.
+"""
+import copy
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import (ALLOWED_HOSTS, BASE_DIR, CACHE_BACKENDS, DATABASES,
+                   MEDIA_ROOT, TEMPLATES)
+
+DEBUG = False
+
+# DJANGO_ALLOWED_HOSTS=example.com,www.example.com
+if os.environ.get('DJANGO_ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
+
+# a worker reconnects every ten minutes at most, not on every request
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': DB_CONN_MAX_AGE}
+    for alias, database in DATABASES.items()
+}
+
+TEMPLATES = copy.deepcopy(TEMPLATES)
+# the cached loader replaces APP_DIRS, it wraps the same two loaders
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+# yatube.wsgi compiles all of the templates at worker boot
+TEMPLATES_WARM_UP = True
+
+# pages, thumbnails and follow sets are shared by all of the workers;
+# redis needs django-redis, which requirements.txt does not install, but
+# only its atomic add() lets one worker at a time render a missing page
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+# `manage.py collectstatic` writes hashed names, which browsers may cache
+# forever, and a .gz copy of each text file for nginx's gzip_static
+STATIC_ROOT = os.environ.get(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'static_root')
+)
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# uploads are served by the web server from here as well
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', MEDIA_ROOT)